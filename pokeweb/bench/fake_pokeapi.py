@@ -0,0 +1,126 @@
+"""Local stand-in for PokeAPI: /pokemon/<id|name>, /pokemon-species/<id>, /type/<name>.
+
+    python bench/fake_pokeapi.py --port 8765 --latency 0.05
+
+Payloads are generated from the id, so they're stable between runs. Point the
+app or seed.py at it with POKEAPI_URL=http://127.0.0.1:8765/api/v2.
+"""
+import argparse, json, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TYPES = [
+    "normal", "fire", "water", "electric", "grass", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+]
+STATS = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+MAX_ID = 1025
+SPRITES = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon"
+
+
+def fake_pokemon(i, base):
+    r = random.Random(i)
+    sprite = f"{SPRITES}/{i}.png"
+    return {
+        "id": i, "name": f"poke{i}", "height": r.randint(1, 50), "weight": r.randint(1, 2000),
+        "sprites": {
+            "front_default": sprite, "front_shiny": f"{SPRITES}/shiny/{i}.png", "back_default": None,
+            "other": {"home": {"front_default": f"{SPRITES}/other/home/{i}.png"}},
+        },
+        "types": [{"slot": k + 1, "type": {"name": t}} for k, t in enumerate(r.sample(TYPES, r.choice([1, 2])))],
+        "stats": [{"base_stat": r.randint(5, 200), "effort": 0, "stat": {"name": s}} for s in STATS],
+        # Real payloads are mostly move/version detail; keep them comparably heavy
+        "moves": [
+            {"move": {"name": f"move{j}"}, "version_group_details": [{"level_learned_at": j}] * 10}
+            for j in range(80)
+        ],
+        "species": {"name": f"poke{i}", "url": f"{base}/pokemon-species/{i}/"},
+    }
+
+
+def fake_species(i):
+    return {
+        "id": i,
+        "generation": {"name": f"generation-{'i' * (1 + i % 3)}"},
+        "flavor_text_entries": [
+            {"flavor_text": "Ein Text.", "language": {"name": "de"}},
+            {"flavor_text": f"Poke{i} is\nvery\fcommon.", "language": {"name": "en"}},
+        ],
+        "evolution_chain": {"url": f"https://pokeapi.co/api/v2/evolution-chain/{(i + 2) // 3}/"},
+    }
+
+
+def fake_type(name):
+    i = TYPES.index(name)
+    rel = lambda k: [{"name": TYPES[(i + k) % len(TYPES)]}]
+    return {"name": name, "damage_relations": {
+        "double_damage_from": rel(1), "double_damage_to": rel(2), "half_damage_from": rel(3),
+        "no_damage_from": rel(4) if i % 3 == 0 else [], "half_damage_to": rel(5), "no_damage_to": [],
+    }}
+
+
+class FakePokeAPI(ThreadingHTTPServer):
+    """Threaded fake server; `latency` seconds are added to every response and
+    `hits` counts requests by path."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.hits = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/api/v2"
+
+    @property
+    def total_hits(self):
+        return sum(self.hits.values())
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        body = None
+        m = re.match(r"/api/v2/(pokemon|pokemon-species|type)/([^/]+)/?$", self.path)
+        if m:
+            kind, key = m.groups()
+            poke_id = int(key) if key.isdigit() else int(key[4:]) if re.fullmatch(r"poke\d+", key) else 0
+            if kind == "pokemon" and 1 <= poke_id <= MAX_ID:
+                body = fake_pokemon(poke_id, server.base_url)
+            elif kind == "pokemon-species" and 1 <= poke_id <= MAX_ID:
+                body = fake_species(poke_id)
+            elif kind == "type" and key in TYPES:
+                body = fake_type(key)
+
+        data = json.dumps(body).encode() if body is not None else b"Not Found"
+        self.send_response(200 if body is not None else 404)
+        self.send_header("Content-Type", "application/json" if body is not None else "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    server = FakePokeAPI(args.port, args.latency)
+    print(f"🧪 Fake PokeAPI on {server.base_url} ({args.latency * 1000:.0f}ms latency)")
+    server.serve_forever()
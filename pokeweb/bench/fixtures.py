@@ -0,0 +1,85 @@
+"""Shared setup for the benchmarks: a seeded fixture DB and result files.
+
+Import this before anything from src/: it points POKEPARTY_DB (and the
+sprite cache) at a throwaway directory unless they're already set.
+"""
+import json, os, subprocess, sys, tempfile, time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+_tmp = tempfile.mkdtemp(prefix="pokeparty-bench-")
+os.environ.setdefault("POKEPARTY_DB", os.path.join(_tmp, "bench.sqlite"))
+os.environ.setdefault("POKEPARTY_SPRITES", os.path.join(_tmp, "sprite_cache"))
+sys.path.insert(0, SRC_DIR)
+
+from fake_pokeapi import TYPES, fake_pokemon, fake_species, fake_type
+
+
+def seed_fixture_db(count=1025, users=20, base_url="https://pokeapi.co/api/v2"):
+    """Fill the bench DB with `count` fake Pokémon (with species and clues),
+    the type chart, and `users` users who've each ranked a few Pokémon."""
+    from models import Session, TypeInfo, User, init_db
+    from pokemon_data import PokemonRecord, store_pokemon, store_species, update_rankings
+    from type_chart import reload_type_chart
+
+    init_db()
+    db = Session()
+    for i in range(1, count + 1):
+        data = fake_pokemon(i, base_url)
+        store_pokemon(db, data, keep_blob=False, fetched_at=time.time())
+        store_species(db, PokemonRecord.from_data(data), fake_species(i))
+    for name in TYPES:
+        rel = fake_type(name)["damage_relations"]
+        names = lambda key: [t["name"] for t in rel[key]]
+        db.add(TypeInfo(name=name, data=json.dumps({
+            "weak_to": names("double_damage_from"), "strong_against": names("double_damage_to"),
+            "resist_from": names("half_damage_from"), "immune_from": names("no_damage_from"),
+            "resist_to": names("half_damage_to"), "immune_to": names("no_damage_to"),
+        })))
+    db.commit()
+
+    for n in range(users):
+        user = User(username=f"benchuser{n}")
+        db.add(user)
+        db.commit()
+        update_rankings(user, {(n * 37 + k * 11) % count + 1: (n * 13 + k) % 1000 + 1 for k in range(25)})
+    reload_type_chart()
+    Session.remove()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(kind, results, out=None):
+    """Write results as JSON (default bench/results/<kind>-<rev>-<time>.json)."""
+    payload = {"kind": kind, "revision": git_revision(), "time": int(time.time()), "results": results}
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{kind}-{payload['revision'] or 'norev'}-{payload['time']}.json")
+    with open(out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"💾 Saved {out}")
+    return out
+
+
+def compare_results(old_path, results, metrics):
+    """Print the change of each metric against a previous results file."""
+    with open(old_path) as f:
+        old = json.load(f)
+    print(f"📊 vs {old.get('revision') or old_path}:")
+    for name, new in results.items():
+        before = old["results"].get(name)
+        if not before:
+            continue
+        for metric in metrics:
+            if metric in new and before.get(metric):
+                change = (new[metric] - before[metric]) / before[metric] * 100
+                print(f"   {name:<28} {metric:<10} {before[metric]:>10.3f} -> {new[metric]:>10.3f} ({change:+.1f}%)")
@@ -0,0 +1,166 @@
+"""Mixed-traffic load test of the app against a fixture DB and a fake PokeAPI.
+
+    python bench/load_test.py --concurrency 16 --duration 20 --latency 0.05
+
+Each worker logs in as its own user and picks routes from a weighted mix
+(games, /rankings, /leaderboard, /update_score bursts). Reports throughput,
+p50/p95/p99 latency and SQL queries per request for every route, and saves
+them as JSON (--out, --compare an older file to see the change).
+"""
+import argparse, logging, os, random, re, threading, time
+
+from fixtures import compare_results, save_results, seed_fixture_db
+from fake_pokeapi import FakePokeAPI
+
+import requests
+
+# (label, weight, method, path); {id} is a random dex number, BURST posts BURST_SIZE scores
+MIX = [
+    ("game/rank", 10, "GET", "/game/rank"),
+    ("game/statsguess", 10, "GET", "/game/statsguess"),
+    ("game/shadowsprite", 10, "GET", "/game/shadowsprite"),
+    ("game/guessfromid", 10, "GET", "/game/guessfromid"),
+    ("game/higherlower", 10, "POST", "/game/higherlower"),
+    ("game/rankrandom", 5, "GET", "/game/rankrandom"),
+    ("pokemon/<name>", 10, "GET", "/pokemon/poke{id}"),
+    ("rankings", 5, "GET", "/rankings"),
+    ("api/rankings", 5, "GET", "/api/rankings?after={id}"),
+    ("leaderboard", 5, "GET", "/leaderboard"),
+    ("update_score", 15, "BURST", "/update_score"),
+]
+BURST_SIZE = 5
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def scrape_queries(base):
+    """{endpoint: total SQL statements} from /metrics, summed over worker pids."""
+    text = requests.get(f"{base}/metrics").text
+    totals = {}
+    for m in re.finditer(r'^pokeparty_db_queries_total\{pid="\d+",endpoint="([^"]+)"\} (\S+)$', text, re.M):
+        totals[m.group(1)] = totals.get(m.group(1), 0.0) + float(m.group(2))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake PokeAPI latency (s)")
+    parser.add_argument("--pokemon", type=int, default=1025,
+                        help="Pokémon seeded in the fixture DB; the rest come from the fake PokeAPI")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the traffic mix")
+    parser.add_argument("--out", help="results JSON path")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    upstream = FakePokeAPI(latency=args.latency).start()
+    os.environ["POKEAPI_URL"] = upstream.base_url
+
+    print(f"🌱 Seeding {args.pokemon} fixture Pokémon...")
+    seed_fixture_db(args.pokemon, users=args.concurrency, base_url=upstream.base_url)
+
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    labels = [m[0] for m in MIX]
+    weights = [m[1] for m in MIX]
+    routes = {m[0]: m for m in MIX}
+    timings = {label: [] for label in labels}
+    errors = {label: 0 for label in labels}
+    endpoints = {}  # label -> Flask endpoint, for the per-route query counts
+    lock = threading.Lock()
+    queries_before = scrape_queries(base)
+    deadline = time.perf_counter() + args.duration
+
+    def worker(n):
+        rng = random.Random(args.seed * 1000 + n)
+        http = requests.Session()
+        http.post(f"{base}/login", data={"username": f"benchuser{n}"})
+        while time.perf_counter() < deadline:
+            label = rng.choices(labels, weights)[0]
+            _, _, method, path = routes[label]
+            path = path.format(id=rng.randint(1, 1025))
+            calls = BURST_SIZE if method == "BURST" else 1
+            for _ in range(calls):
+                start = time.perf_counter()
+                if method == "GET":
+                    resp = http.get(base + path)
+                elif method == "POST":
+                    resp = http.post(base + path, data={"choice": rng.choice(["left", "right"])})
+                else:
+                    resp = http.post(base + path, json={"name": f"poke{rng.randint(1, args.pokemon)}",
+                                                        "score": rng.randint(1, 1000)})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    timings[label].append(elapsed)
+                    if resp.status_code >= 400:
+                        errors[label] += 1
+
+    print(f"🚦 {args.concurrency} workers for {args.duration:.0f}s, PokeAPI latency {args.latency * 1000:.0f}ms...")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    queries = scrape_queries(base)
+    server.shutdown()
+
+    # Map routes to Flask endpoints to attribute query counts
+    from app import app
+    adapter = app.url_map.bind("localhost")
+    for label, (_, _, method, path) in routes.items():
+        endpoint, _ = adapter.match(path.format(id=1).split("?")[0], method="GET" if method == "GET" else "POST")
+        endpoints[label] = endpoint
+
+    results = {}
+    total = sum(len(t) for t in timings.values())
+    print(f"\n{'route':<20} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>6}")
+    for label in labels:
+        values = sorted(timings[label])
+        if not values:
+            continue
+        executed = queries.get(endpoints[label], 0) - queries_before.get(endpoints[label], 0)
+        row = {
+            "requests": len(values),
+            "rps": len(values) / wall,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "queries_per_request": executed / len(values),
+            "errors": errors[label],
+        }
+        results[label] = row
+        print(f"{label:<20} {row['requests']:>6} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['queries_per_request']:>8.1f} {row['errors']:>6}")
+    all_values = sorted(v for t in timings.values() for v in t)
+    results["total"] = {
+        "requests": total, "rps": total / wall,
+        "p50_ms": percentile(all_values, 50) * 1000,
+        "p95_ms": percentile(all_values, 95) * 1000,
+        "p99_ms": percentile(all_values, 99) * 1000,
+        "upstream_calls": upstream.total_hits,
+    }
+    print(f"\n🎯 {total} requests in {wall:.1f}s -> {total / wall:.0f} req/s, "
+          f"p95 {results['total']['p95_ms']:.1f}ms, {upstream.total_hits} PokeAPI calls")
+
+    save_results("load", {"config": vars(args), **results}, args.out)
+    if args.compare:
+        compare_results(args.compare, results, ["rps", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
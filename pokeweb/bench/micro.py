@@ -0,0 +1,56 @@
+"""Microbenchmarks of the hot helpers: sprite extraction, clues, type matchups, JSON.
+
+    python bench/micro.py [--number 2000] [--out results.json] [--compare old.json]
+
+Uses the fake PokeAPI payloads (no server needed) and a small fixture DB for
+the type chart. Reports the best-of-5 time per call in microseconds.
+"""
+import argparse, json, timeit
+
+from fixtures import compare_results, save_results, seed_fixture_db
+from fake_pokeapi import TYPES, fake_pokemon, fake_species
+
+
+def bench(label, fn, number, repeat=5):
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    print(f"{label:<28} {best * 1e6:>10.2f} µs")
+    return {"us_per_call": best * 1e6, "number": number}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--out", help="results JSON path")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    seed_fixture_db(count=50, users=0)
+    from pokemon_data import (
+        PokemonRecord, build_clues, extract_sprites, get_type_effectiveness, get_type_matchups,
+    )
+
+    data = fake_pokemon(25, "https://pokeapi.co/api/v2")
+    raw = json.dumps(data)
+    species = fake_species(25)
+    record = PokemonRecord.from_data(data)
+    n = args.number
+
+    results = {
+        "extract_sprites": bench("extract_sprites", lambda: extract_sprites(data), n),
+        "build_clues": bench("build_clues", lambda: build_clues(record, species), n),
+        "get_type_matchups": bench("get_type_matchups", lambda: get_type_matchups("fire"), n),
+        "get_type_matchups_all": bench(
+            "get_type_matchups (x18)", lambda: [get_type_matchups(t) for t in TYPES], max(1, n // 18)),
+        "get_type_effectiveness": bench(
+            "get_type_effectiveness", lambda: get_type_effectiveness(["fire", "flying"]), n),
+        "json_loads_pokemon": bench(f"json.loads ({len(raw) // 1024} KB)", lambda: json.loads(raw), max(1, n // 10)),
+        "record_from_data": bench("PokemonRecord.from_data", lambda: PokemonRecord.from_data(data), n),
+    }
+
+    save_results("micro", results, args.out)
+    if args.compare:
+        compare_results(args.compare, results, ["us_per_call"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Concurrent /update_score writers against a throwaway DB seeded with fixture Pokémon.
+
+    python bench/update_score_load.py --users 16 --requests 200
+
+Prints throughput and how many requests failed (e.g. "database is locked").
+"""
+import argparse, logging, os, sys, tempfile, threading, time
+
+import requests
+
+POKEMON = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=16, help="concurrent writers")
+    parser.add_argument("--requests", type=int, default=200, help="score updates per writer")
+    parser.add_argument("--db", help="DB file to use (default: a temp file)")
+    args = parser.parse_args()
+
+    os.environ["POKEPARTY_DB"] = args.db or os.path.join(tempfile.mkdtemp(), "load.sqlite")
+    # Everything scored is seeded, so nothing should ever reach PokeAPI
+    os.environ["POKEPARTY_OFFLINE"] = "1"
+    from fixtures import seed_fixture_db
+    from werkzeug.serving import make_server
+
+    seed_fixture_db(POKEMON, users=0)
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    errors = []
+    ok = [0]
+    lock = threading.Lock()
+
+    def writer(n):
+        http = requests.Session()
+        http.post(f"{base}/login", data={"username": f"loaduser{n}"})
+        for i in range(args.requests):
+            resp = http.post(f"{base}/update_score", json={"name": f"poke{i % POKEMON + 1}", "score": i % 1000 + 1})
+            with lock:
+                if resp.status_code == 200:
+                    ok[0] += 1
+                else:
+                    errors.append((resp.status_code, resp.text[:200]))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    locked = sum(1 for _, body in errors if "locked" in body)
+    print(f"{ok[0]} ok, {len(errors)} failed ({locked} 'database is locked') "
+          f"in {elapsed:.2f}s -> {ok[0] / elapsed:.0f} req/s")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Concurrent PokeAPI fetches against the local fake server.
+
+    python bench/upstream_load.py --requests 2000 --concurrency 64 --distinct 100 --latency 0.05
+
+Compares bare requests.get (the old fetch_pokemon) with the shared client,
+from threads and from asyncio, and shows the circuit breaker cutting off a
+hung upstream.
+"""
+import argparse, asyncio, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from fake_pokeapi import FakePokeAPI
+from upstream import CircuitBreaker, UpstreamClient
+
+
+def report(label, n, elapsed, server, client=None):
+    line = f"{label:<22} {n / elapsed:>8.0f} req/s  {server.total_hits:>5} upstream calls"
+    if client:
+        line += f"  {client.counters['coalesced']:>5} coalesced"
+    print(line)
+    server.hits.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=100, help="distinct Pokémon ids requested")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency (s)")
+    args = parser.parse_args()
+
+    server = FakePokeAPI(latency=args.latency).start()
+    urls = [f"{server.base_url}/pokemon/{i % args.distinct + 1}" for i in range(args.requests)]
+
+    def bare(url):
+        resp = requests.get(url)
+        return resp.json() if resp.status_code == 200 else None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        assert all(pool.map(bare, urls))
+    report("bare requests.get", args.requests, time.perf_counter() - start, server)
+
+    client = UpstreamClient(pool_size=args.concurrency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        assert all(pool.map(client.get_json, urls))
+    report("client (threads)", args.requests, time.perf_counter() - start, server, client)
+
+    async def run_async():
+        return await asyncio.gather(*(client.aget_json(url) for url in urls))
+
+    client = UpstreamClient(pool_size=args.concurrency)
+    start = time.perf_counter()
+    assert all(asyncio.run(run_async()))
+    report("client (asyncio)", args.requests, time.perf_counter() - start, server, client)
+
+    # A hung upstream: every call times out until the breaker opens, then fails fast
+    server.latency = 2
+    client = UpstreamClient(pool_size=8, timeout=(1, 0.2), breaker=CircuitBreaker(threshold=5, cooldown=30), retries=0)
+    start = time.perf_counter()
+    results = [client.get_json(f"{server.base_url}/pokemon/{i}") for i in range(1, 51)]
+    elapsed = time.perf_counter() - start
+    print(f"{'hung upstream':<22} {len(results)} calls in {elapsed:.2f}s, "
+          f"{client.counters['failures']} timed out, {client.counters['short_circuited']} short-circuited "
+          f"(breaker {client.breaker.state})")
+    assert not any(results)
+
+
+if __name__ == "__main__":
+    main()
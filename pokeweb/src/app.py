@@ -1,11 +1,27 @@
-
-import requests
-import json
+import startup  # first, so the startup report covers every import
+import os
 import random
-
-from flask import Flask, jsonify, Response, render_template, request, session, redirect, url_for
-from models import Session, Pokemon, User, PokemonRank
-from pokemon_data import *
+import secrets
+
+from flask import Flask, jsonify, Response, abort, render_template, request, send_file, session, redirect, url_for
+from sqlalchemy import or_
+from models import Session, Pokemon, schema_ready
+from pokemon_data import (
+    GENERATIONS, MAX_ID_KEY, TYPE_NAMES, pokeapi, check_db_for_ranking, get_pokemon_record, get_pokemon_records,
+    get_type_chart, get_type_matchups, load_snapshot, not_found_cache_stats, parse_pokemon_id,
+    pokemon_cache_stats, preload_pokemon_records, rankings_page, snapshot_stats, suggest_pokemon_names,
+    update_ranking, update_rankings,
+)
+from sprites import local_sprite_url, sprite_file
+from atlas import atlas_file, atlas_sprite, atlas_version
+from game_state import make_game_store
+from round_pool import make_round_pool
+from leaderboard import top_scores, community_averages, user_top, leaderboard_version
+from page_cache import cached_page, enable_bytecode_cache, page_cache_stats
+from users import CurrentUser, get_or_create_user, user_ids
+import metrics
+
+startup.mark("app modules")
 
 # ----------------------------------------------------------------------------
 # Flask setup
@@ -13,6 +29,114 @@ from pokemon_data import *
 app = Flask(__name__)
 app.secret_key = "super_secret_key"
 
+# How many Pokémon the blind ranker deals out per game
+RANK_SIZE = int(os.environ.get("POKEPARTY_RANK_SIZE", 7))
+
+# Rankings grid page size (first page server-rendered, the rest via /api/rankings)
+RANKINGS_PAGE_SIZE = 60
+MAX_RANKINGS_PAGE = 200
+
+# Upper bound on /update_scores batch size (a bit more than the whole dex)
+MAX_BULK_SCORES = 2000
+
+# Compile every template before serving (in the gunicorn master, so workers share them)
+WARM_UP = os.environ.get("POKEPARTY_WARMUP", "1").lower() not in ("0", "false", "no")
+
+# Templates write {{ url|sprite }} to use the local sprite cache when it has a copy
+app.jinja_env.filters["sprite"] = local_sprite_url
+# ... and {{ atlas_sprite(id_or_name, size) }} for a CSS-sprite cell from the atlases
+app.jinja_env.globals["atlas_sprite"] = atlas_sprite
+# Compiled templates are kept on disk, so a restart doesn't recompile them
+enable_bytecode_cache(app)
+
+# Request/DB/render timings for /metrics (and Server-Timing if POKEPARTY_SERVER_TIMING=1)
+metrics.instrument_app(app)
+
+
+# In-progress games live server-side (see game_state.py); the cookie only
+# carries a random game session id
+games = make_game_store()
+
+
+# Ready-made rounds for the random games, refilled by a background thread
+rounds = make_round_pool(RANK_SIZE)
+
+metrics.register_collector(startup.collect)
+startup.mark("app setup", kind="init")
+
+
+def game_session_id():
+    if "game_sid" not in session:
+        session["game_sid"] = secrets.token_urlsafe(16)
+    return session["game_sid"]
+
+
+def current_user():
+    """The logged-in user, or None.
+
+    Login stores the user id in the session along with the "users" cache
+    version it was resolved under; while that version is current the id is
+    used as is. After a user deletion bumps it, the id is re-resolved
+    through the username -> id cache, and a deleted user is logged out.
+    """
+    username = session.get("username")
+    if not username:
+        return None
+    version = user_ids.version()
+    if session.get("user_id") is None or session.get("users_version") != version:
+        user_id = user_ids.get(username)
+        if user_id is None:
+            session.clear()
+            return None
+        session["user_id"], session["users_version"] = user_id, version
+    return CurrentUser(session["user_id"], username)
+
+
+@app.teardown_appcontext
+def remove_db_session(exc=None):
+    # Return the request's connection to the pool, ending any open transaction
+    Session.remove()
+
+def preload():
+    """Load the type chart and map the Pokédex snapshot (or else load every
+    seeded Pokémon record).
+
+    Under gunicorn (preload_app) this runs once in the master, so workers
+    start warm and share the data copy-on-write (the snapshot's pages are
+    shared outright).
+    """
+    with startup.phase("type chart"):
+        get_type_chart()
+    with startup.phase("snapshot"):
+        snapshot = load_snapshot()
+    with startup.phase("pokemon"):
+        loaded = preload_pokemon_records()
+    Session.remove()
+    print(f"📦 Preloaded type chart and {loaded} Pokémon{' (snapshot)' if snapshot else ''}")
+
+
+def warm_up():
+    """Compile the templates now rather than on each worker's first requests."""
+    with startup.phase("templates"):
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+
+
+def create_app(preload_data=True, warm=WARM_UP):
+    """App factory, e.g. gunicorn "app:create_app()".
+
+    Doesn't create or migrate tables: run `python migrate.py init-db` first.
+    """
+    with startup.phase("schema check"):
+        if not schema_ready():
+            raise SystemExit("❌ Database isn't initialized, run: python migrate.py init-db")
+    if preload_data:
+        preload()
+    if warm:
+        warm_up()
+    print(startup.report())
+    return app
+
 
 # ----------------------------------------------------------------------------
 # Routes
@@ -24,43 +148,57 @@ def home():
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
-    db = Session()
-
     if request.method == 'POST':
         username = request.form.get('username', '').strip().lower()
         if not username:
             return render_template('login.html', error="Please enter a username.")
 
-        # Check if user exists
-        user = db.query(User).filter_by(username=username).first()
-
-        # Create if not found
-        if not user:
-            user = User(username=username)
-            db.add(user)
-            db.commit()
-
-        # Store in session
+        # Get or create in one statement, then keep the id in the session
         session['username'] = username
+        session['user_id'] = get_or_create_user(username)
+        session['users_version'] = user_ids.version()
 
         return redirect(url_for('pokeparty_home'))  # Redirect to your main hub
 
-    return render_template('login.html', error=None)
+    return cached_page(("login",), lambda: render_template('login.html', error=None))
 
 @app.route('/pokeparty')
 def pokeparty_home():
-    return render_template('pokeparty.html')
+    return cached_page(("pokeparty",), lambda: render_template('pokeparty.html'))
+
+def send_immutable(path, content_type, etag):
+    resp = send_file(path, mimetype=content_type, conditional=True, etag=etag, max_age=31536000)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+@app.route('/sprites/<name>')
+def serve_sprite(name):
+    # Content-addressed, so the URL changes whenever the image does
+    found = sprite_file(name)
+    if not found:
+        abort(404)
+    path, content_type = found
+    return send_immutable(path, content_type, name.split(".")[0])
+
+@app.route('/sprites/atlas/<name>')
+def serve_atlas(name):
+    # Atlas file names carry a hash of their contents too
+    path = atlas_file(name)
+    if not path:
+        abort(404)
+    return send_immutable(path, "image/png", name.split(".")[1])
 
 @app.route('/pokemon/<name>')
 def get_pokemon(name):
-    data = get_or_cache_pokemon(name)
-    if not data:
-        return "Pokémon not found", 404
+    poke = get_pokemon_record(name)
+    if not poke:
+        return render_template('pokemon_notfound.html', name=name, suggestions=suggest_pokemon_names(name)), 404
 
-    sprites = extract_sprites(data)
-    types = extract_types(data)
-    stats = extract_stats(data)
-    moves = extract_moves(data)
+    sprites = poke.sprites
+    types = poke.types
+    stats = poke.stats
+    moves = poke.moves
 
     return render_template(
         'pokemon.html',
@@ -74,15 +212,14 @@ def get_pokemon(name):
 @app.route('/game/rank')
 def pokemon_ranker():
     use_shiny = request.args.get("shiny") == "on"
-    pokemon_list = []
-
-    for _ in range(7):
-        poke_id = get_random_pokemon_id()
-        data = fetch_pokemon(poke_id)
-        if data:
-            sprite_url = data["sprites"]["front_shiny"] if use_shiny else data["sprites"]["front_default"]
-            pokemon_list.append({"name": data["name"], "sprite": sprite_url})
+    round_ = rounds.pop("rank")
+    if not round_:
+        return "Error fetching Pokémon data", 500
 
+    pokemon_list = [
+        {"name": name, "sprite": local_sprite_url(shiny if use_shiny else sprite)}
+        for name, sprite, shiny in round_["pokemon"]
+    ]
     return render_template('rank.html', pokemon_list=pokemon_list)
 
 
@@ -93,96 +230,75 @@ def pokemon_ranker():
 
 @app.route('/game/statsguess')
 def pokemon_stats_guess():
-    poke_id = get_random_pokemon_id()
-    data = fetch_pokemon(poke_id)
-    if not data:
+    round_ = rounds.pop("statsguess")
+    if not round_:
         return "Error fetching Pokémon data", 500
 
-    species = fetch_species(data["species"]["url"])
-    clues = build_clues(data, species)
-
-    return render_template(
-        "statsguess.html",
-        clues=clues,
-        sprite=data["sprites"]["front_default"],
-        name=data["name"]
-    )
+    return render_template("statsguess.html", **round_)
 
 @app.route('/game/shadowsprite')
 def pokemon_dark_sprite_guess():
-    poke_id = get_random_pokemon_id()
-    data = fetch_pokemon(poke_id)
-    if not data:
+    round_ = rounds.pop("shadowsprite")
+    if not round_:
         return "Error fetching Pokémon data", 500
 
-    return render_template(
-        "shadowsprite.html",
-        sprite_url=data["sprites"]["front_default"],
-        name=data["name"]
-    )
+    return render_template("shadowsprite.html", **round_)
 
 @app.route('/game/higherlower', methods=["GET", "POST"])
 def pokemon_higher_lower():
     result = None
-    if "previous" not in session:
-            # fetch a random Pokémon for the left slot
-            poke_id2 = random.randint(1, 1025)
-            data2 = requests.get(f'https://pokeapi.co/api/v2/pokemon/{poke_id2}').json()
-            session["previous"] = (
-                data2["name"],
-                data2["sprites"]["front_default"],
-                extract_stats(data2),
-            )
+    sid = game_session_id()
+    state = games.get(sid, "higherlower")
+    previous_id = state and state["previous"]
 
     # Handle guess
-    if request.method == "POST":
+    if request.method == "POST" and state:
         choice = request.form["choice"]
-        name2, sprite_url2, stats2 = session["previous"]
-        name, sprite_url, stats, stat_choice = session["current_round"]
+        stat_choice = state["stat"]
+        poke2, poke = get_pokemon_records([state["previous"], state["current"]])
+        if not (poke2 and poke):
+            return "Error fetching Pokémon data", 500
 
-        left_value = stats2[stat_choice]
-        right_value = stats[stat_choice]
+        left_value = poke2.stats[stat_choice]
+        right_value = poke.stats[stat_choice]
 
         if (choice == "left" and left_value >= right_value) or \
            (choice == "right" and right_value >= left_value):
             result = f"✅ Correct! {stat_choice.capitalize()} values: {left_value} vs {right_value}"
-            session["previous"] = (name2, sprite_url2, stats2) if choice == "left" else (name, sprite_url, stats)
+            previous_id = poke2.id if choice == "left" else poke.id
         else:
             result = f"❌ Wrong! {stat_choice.capitalize()} values: {left_value} vs {right_value}"
-            new_data = fetch_pokemon(get_random_pokemon_id())
-            session["previous"] = (
-                new_data["name"],
-                new_data["sprites"]["front_default"],
-                extract_stats(new_data)
-            )
-
-    # Prepare left (previous)
-    name2, sprite_url2, stats2 = session["previous"]
+            previous_id = None
 
-    # Generate right
-    data = fetch_pokemon(get_random_pokemon_id())
-    name = data["name"]
-    sprite_url = data["sprites"]["front_default"]
-    stats = extract_stats(data)
+    # One lookup for both sides; the pool has already loaded the new ones
+    # and the left one is usually still in the record cache
+    round_ = rounds.pop("higherlower")
+    if not round_:
+        return "Error fetching Pokémon data", 500
+    ids = round_["ids"]
+    if previous_id:
+        ids = [previous_id, ids[1] if ids[1] != previous_id else ids[0]]
+    poke2, poke = get_pokemon_records(ids)
+    if not (poke2 and poke):
+        return "Error fetching Pokémon data", 500
 
-    stat_choice = random.choice(list(stats.keys()))
-    session["current_round"] = (name, sprite_url, stats, stat_choice)
+    stat_choice = random.choice(list(poke.stats.keys()))
+    games.set(sid, "higherlower", {"previous": poke2.id, "current": poke.id, "stat": stat_choice})
 
     return render_template(
         "higherlower.html",
-        name=name, sprite_url=sprite_url, stats=stats,
-        name2=name2, sprite_url2=sprite_url2, stats2=stats2,
+        name=poke.name, sprite_url=poke.sprite, stats=poke.stats,
+        name2=poke2.name, sprite_url2=poke2.sprite, stats2=poke2.stats,
         stat_choice=stat_choice,
         result=result
     )
 
 @app.route('/game/guessfromid')
 def pokemon_guess_from_id():
-    poke_id = get_random_pokemon_id()
-    data = fetch_pokemon(poke_id)
-    name = data["name"]
-    sprite_url = data["sprites"]["front_default"]
-    return render_template('guessfromid.html',name=name, id=poke_id,sprite_url=sprite_url)
+    round_ = rounds.pop("guessfromid")
+    if not round_:
+        return "Error fetching Pokémon data", 500
+    return render_template('guessfromid.html', **round_)
 
 @app.route('/game/typematch', methods=["GET", "POST"])
 def type_match_game():
@@ -233,133 +349,266 @@ def type_match_game():
 
     # GET: present a random type and blank form
     type_name = random.choice(TYPE_NAMES)
-    return render_template(
+    return cached_page(("typematch", type_name), lambda: render_template(
         'typematch.html',
         mode='play',
         type_name=type_name,
         all_types=all_types,
-    )
+    ))
 
 @app.route('/game/rankrandom', methods=["GET", "POST"])
 def pokemon_rank_from_id():
-    if 'username' not in session:
+    user = current_user()
+    if not user:
         return redirect(url_for('login'))
 
-    db = Session()
-    user = db.query(User).filter_by(username=session['username']).first()
-
     if request.method == "POST":
         name = request.form["name"]
         score = int(request.form["score"])
 
-        rank_entry = db.query(PokemonRank).filter_by(name=name, user_id=user.id).first()
+        poke = get_pokemon_record(request.form.get("pokemon_id") or name)
+        if not poke:
+            return "Pokémon not found", 404
 
-        if rank_entry:
-            old_score = rank_entry.score
-            rank_entry.score = score
-            db.commit()
+        old_score, score = update_ranking(user, poke.id, score)
+        if old_score is not None:
             result = f"🔄 Updated ranking for {name.title()}: old {old_score}, new {score}"
         else:
-            new_rank = PokemonRank(name=name, score=score, user_id=user.id)
-            db.add(new_rank)
-            db.commit()
             result = f"⭐ New ranking saved for {name.title()}: {score}"
 
         sprite_url = request.form["sprite_url"]
-        return render_template("rankrandom.html", name=name, sprite_url=sprite_url, rank=score, result=result)
+        return render_template("rankrandom.html", name=name, pokemon_id=poke.id, sprite_url=sprite_url, rank=score, result=result)
 
     # GET → new random Pokémon
-    poke_id = get_random_pokemon_id()
-    data = fetch_pokemon(poke_id)
-    name = data["name"]
-    sprite_url = data["sprites"]["front_default"]
+    round_ = rounds.pop("rankrandom")
+    if not round_:
+        return "Error fetching Pokémon data", 500
 
-    rank_entry = db.query(PokemonRank).filter_by(name=name, user_id=user.id).first()
-    rank = rank_entry.score if rank_entry else None
+    _, rank = check_db_for_ranking(round_["id"], user.id)
 
-    return render_template("rankrandom.html", name=name, sprite_url=sprite_url, rank=rank, result=None)
+    return render_template("rankrandom.html", name=round_["name"], pokemon_id=round_["id"], sprite_url=round_["sprite_url"], rank=rank, result=None)
+
+
+def rankings_filters():
+    """generation/type/unranked filters from the query string."""
+    generation = request.args.get("gen", type=int)
+    type_name = (request.args.get("type") or "").lower()
+    return {
+        "generation": generation if generation in GENERATIONS else None,
+        "type_name": type_name if type_name in TYPE_NAMES else None,
+        "unranked": request.args.get("unranked") == "1",
+    }
+
+
+def ranking_card(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "sprite_url": local_sprite_url(row.sprite_url),
+        "cell": atlas_sprite(row.id, 96),
+        "score": row.score,
+    }
 
 
 @app.route('/rankings')
 def show_all_rankings():
-    if 'username' not in session:
+    user = current_user()
+    if not user:
         return redirect(url_for('login'))
 
-    db = Session()
-    user = db.query(User).filter_by(username=session['username']).first()
+    # Only the first page is rendered; the grid fetches the rest from
+    # /api/rankings as the user scrolls
+    filters = rankings_filters()
+    rows, next_after = rankings_page(user.id, limit=RANKINGS_PAGE_SIZE, **filters)
 
-    pokemon_list = db.query(Pokemon).order_by(Pokemon.id).all()
-    rank_map = {
-        r.name: r.score
-        for r in db.query(PokemonRank).filter_by(user_id=user.id).all()
-    }
+    return render_template(
+        "allrankings.html",
+        pokemon_list=[ranking_card(r) for r in rows],
+        next_after=next_after,
+        filters=filters,
+        generations=GENERATIONS,
+        type_names=TYPE_NAMES,
+    )
 
-    result = [
-        {"id": p.id, "name": p.name, "sprite_url": p.sprite_url, "score": rank_map.get(p.name)}
-        for p in pokemon_list
-    ]
 
-    return render_template("allrankings.html", pokemon_list=result)
+@app.route('/api/rankings')
+def rankings_api():
+    """Next page of the rankings grid: ?after=<last id>&gen=&type=&unranked=1"""
+    user = current_user()
+    if not user:
+        return {"success": False, "error": "User not logged in"}, 403
+
+    limit = min(max(request.args.get("limit", RANKINGS_PAGE_SIZE, type=int), 1), MAX_RANKINGS_PAGE)
+    # Clamped into the id range, so a huge value is an empty page rather than an overflow in SQLite
+    after = min(max(request.args.get("after", 0, type=int), 0), MAX_ID_KEY)
+    rows, next_after = rankings_page(user.id, after=after, limit=limit, **rankings_filters())
+    return {"pokemon": [ranking_card(r) for r in rows], "next": next_after}
 
 
 @app.route("/update_score", methods=["POST"])
 def update_score():
-    if 'username' not in session:
+    user = current_user()
+    if not user:
         return {"success": False, "error": "User not logged in"}, 403
 
-    db = Session()
-    data = request.get_json()
-    name = data["name"]
-    score = int(data["score"])
+    data = request.get_json(silent=True) or {}
+    name = data.get("name")
+    try:
+        score = int(data.get("score"))
+    except (TypeError, ValueError, OverflowError):
+        return {"success": False, "error": "Score must be a number"}, 400
+    if not 1 <= score <= 1000:
+        return {"success": False, "error": "Score must be between 1 and 1000"}, 400
+    pokemon_id = parse_pokemon_id(data.get("id"))
+    if data.get("id") and pokemon_id is None:
+        return {"success": False, "error": "Invalid Pokémon id"}, 400
+    if not (pokemon_id or name):
+        return {"success": False, "error": "Expected an 'id' or 'name'"}, 400
+
+    poke = get_pokemon_record(pokemon_id or name)
+    if not poke:
+        return {"success": False, "error": "Pokémon not found"}, 404
+
+    update_ranking(user, poke.id, score)
+    return {"success": True, "name": name, "score": score}
+
 
-    user = db.query(User).filter_by(username=session['username']).first()
+@app.route("/update_scores", methods=["POST"])
+def update_scores():
+    """Bulk version of /update_score: {"scores": [{"id"|"name", "score"}, ...]}.
+
+    Everything valid is saved in one transaction; the response reports a
+    result per item, in order.
+    """
+    user = current_user()
     if not user:
-        return {"success": False, "error": "User not found"}, 404
+        return {"success": False, "error": "User not logged in"}, 403
 
-    # find or create
-    rank_entry = db.query(PokemonRank).filter_by(name=name, user_id=user.id).first()
-    if rank_entry:
-        rank_entry.score = score
-    else:
-        rank_entry = PokemonRank(name=name, score=score, user_id=user.id)
-        db.add(rank_entry)
+    data = request.get_json(silent=True) or {}
+    items = data.get("scores")
+    if not isinstance(items, list) or not items:
+        return {"success": False, "error": "Expected a non-empty 'scores' list"}, 400
+    if len(items) > MAX_BULK_SCORES:
+        return {"success": False, "error": f"At most {MAX_BULK_SCORES} scores per request"}, 400
 
-    db.commit()
-    return {"success": True, "name": name, "score": score}
+    db = Session()
+
+    # Resolve every id/name with one query
+    ids = {parse_pokemon_id(i.get("id")) for i in items if isinstance(i, dict)} - {None}
+    names = {str(i["name"]).lower() for i in items if isinstance(i, dict) and i.get("name")}
+    known = db.query(Pokemon.id, Pokemon.name).filter(
+        or_(Pokemon.id.in_(ids), Pokemon.name.in_(names))
+    ).all()
+    by_id = {pid: name for pid, name in known}
+    by_name = {name: pid for pid, name in known}
+
+    results = []
+    scores = {}
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"success": False, "error": "Invalid item"})
+            continue
+        name = item.get("name")
+        try:
+            score = int(item.get("score"))
+        except (TypeError, ValueError, OverflowError):
+            results.append({"name": name, "success": False, "error": "Score must be a number"})
+            continue
+        if not 1 <= score <= 1000:
+            results.append({"name": name, "success": False, "error": "Score must be between 1 and 1000"})
+            continue
+
+        pokemon_id = parse_pokemon_id(item.get("id"))
+        if item.get("id") is not None and pokemon_id is None:
+            results.append({"name": name, "success": False, "error": "Invalid Pokémon id"})
+            continue
+        if pokemon_id not in by_id:
+            pokemon_id = by_name.get(str(name).lower())
+        if pokemon_id is None:
+            results.append({"name": name, "success": False, "error": "Pokémon not found"})
+            continue
+
+        scores[pokemon_id] = score  # later edits of the same Pokémon win
+        results.append({"id": pokemon_id, "name": by_id.get(pokemon_id, name), "score": score, "success": True})
+
+    if scores:
+        update_rankings(user, scores)
+
+    return {"success": all(r["success"] for r in results), "results": results}
+
+
+@app.route('/stats/rounds')
+def round_pool_stats():
+    """Queue depth, underflows and build failures of the round pools."""
+    return jsonify(rounds.stats())
+
+
+@metrics.register_collector
+def collect_app_stats():
+    caches = {
+        "pokemon_records": pokemon_cache_stats(),
+        "not_found": not_found_cache_stats(),
+        "pages": page_cache_stats(),
+        "user_ids": user_ids.stats(),
+    }
+    snapshot = snapshot_stats()
+    if snapshot:
+        caches["snapshot"] = snapshot  # looked up before pokemon_records
+    for cache, stats in caches.items():
+        labels = {"cache": cache}
+        yield "pokeparty_cache_entries", "gauge", "Entries in a cache", labels, stats["entries"]
+        yield "pokeparty_cache_bytes", "gauge", "Approximate size of a cache", labels, stats["bytes"]
+        for key in ("hits", "misses", "evictions"):
+            yield f"pokeparty_cache_{key}_total", "counter", f"Cache {key}", labels, stats[key]
+        lookups = stats["hits"] + stats["misses"]
+        yield ("pokeparty_cache_hit_ratio", "gauge", "Cache hits / lookups", labels,
+               stats["hits"] / lookups if lookups else 0)
+
+    for game, stats in rounds.stats().items():
+        labels = {"game": game}
+        yield "pokeparty_round_pool_depth", "gauge", "Ready rounds queued", labels, stats["depth"]
+        for key in ("served", "underflow", "built", "failed"):
+            yield f"pokeparty_round_pool_{key}_total", "counter", f"Rounds {key}", labels, stats[key]
+
+    upstream = pokeapi.stats()
+    for key in ("requests", "coalesced", "failures", "short_circuited"):
+        yield f"pokeparty_upstream_{key}_total", "counter", f"PokeAPI {key}", {}, upstream[key]
+    yield "pokeparty_upstream_in_flight", "gauge", "PokeAPI calls in flight", {}, upstream["in_flight"]
+    yield ("pokeparty_upstream_breaker_open", "gauge", "1 while the PokeAPI circuit breaker is open", {},
+           upstream["breaker"] != "closed")
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route('/leaderboard')
 def show_leaderboard():
-    db = Session()
+    # Read from the materialized tables kept up to date by record_score(),
+    # and only re-rendered after a score write or an atlas rebuild
+    return cached_page(("leaderboard", leaderboard_version(), atlas_version()), lambda: render_template(
+        "leaderboard.html",
+        leaderboard=top_scores(100),
+        community=community_averages(20),
+        user_view=None,
+    ))
 
-    # Get only Pokémon that HAVE scores (join + order by)
-    ranked = (
-        db.query(
-            User.username,
-            Pokemon.name,
-            Pokemon.sprite_url,
-            PokemonRank.score
-        )
-        .join(PokemonRank, User.id == PokemonRank.user_id)
-        .join(Pokemon, Pokemon.name == PokemonRank.name)
-        .filter(PokemonRank.score.isnot(None))
-        .order_by(PokemonRank.score.desc())
-        .limit(100)
-        .all()
-    )
 
-    # Convert to dicts for template
-    leaderboard = [
-        {
-            "username": u,
-            "pokemon": n,
-            "sprite_url": s,
-            "score": sc
-        }
-        for u, n, s, sc in ranked
-    ]
+@app.route('/leaderboard/<username>')
+def show_user_leaderboard(username):
+    username = username.lower()
+    user_id = user_ids.get(username)
+    if user_id is None:
+        return "User not found", 404
 
-    return render_template("leaderboard.html", leaderboard=leaderboard)
+    key = ("leaderboard", username, leaderboard_version(), atlas_version())
+    return cached_page(key, lambda: render_template(
+        "leaderboard.html",
+        leaderboard=user_top(user_id, 25),
+        community=[],
+        user_view=username,
+    ))
 
 
 
@@ -367,5 +616,8 @@ def show_leaderboard():
 # Main
 # ----------------------------------------------------------------------------
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Dev server; production runs gunicorn -c gunicorn.conf.py (see start.sh)
+    from models import init_db
+    init_db()
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
 
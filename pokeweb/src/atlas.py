@@ -0,0 +1,215 @@
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from models import Session, Pokemon, PokemonSprite, SpriteFile
+from sprites import SPRITE_DIR, sprite_path
+
+# Spritesheets built from the local sprite cache (see seed.py sprites)
+ATLAS_DIR = os.path.join(SPRITE_DIR, "atlas")
+INDEX_PATH = os.path.join(ATLAS_DIR, "index.json")
+INDEX_VERSION = 1
+
+CELL = 96         # front_default sprites are 96x96
+PER_ROW = 16
+PER_ATLAS = 256   # Pokémon ids 1-256 go in atlas 0, 257-512 in atlas 1, ...
+
+ATLAS_FILE_RE = re.compile(r"^[a-z_]+-\d+\.[0-9a-f]{12}\.png$")
+
+_index = None
+_index_checked = None  # monotonic time of the last check (None = never)
+_index_mtime = None
+_lock = threading.Lock()
+
+
+def _sources(db, kind):
+    """[(pokemon_id, name, digest, content_type)] for every cached sprite of a kind."""
+    if kind == "front_default":
+        rows = db.query(Pokemon.id, Pokemon.name, Pokemon.sprite_url).all()
+    else:
+        rows = (
+            db.query(Pokemon.id, Pokemon.name, PokemonSprite.url)
+            .join(PokemonSprite, PokemonSprite.pokemon_id == Pokemon.id)
+            .filter(PokemonSprite.kind == kind)
+            .all()
+        )
+    files = {
+        url: (digest, ctype)
+        for url, digest, ctype in db.query(SpriteFile.url, SpriteFile.digest, SpriteFile.content_type).all()
+    }
+    return [
+        (pid, name) + files[url]
+        for pid, name, url in rows
+        if url in files and files[url][1] != "image/svg+xml"
+    ]
+
+
+def _render(members):
+    from PIL import Image
+
+    rows = max((pid - 1) % PER_ATLAS for pid, *_ in members) // PER_ROW + 1
+    sheet = Image.new("RGBA", (PER_ROW * CELL, rows * CELL))
+    for pid, _, digest, ctype in members:
+        slot = (pid - 1) % PER_ATLAS
+        with Image.open(sprite_path(digest, ctype)) as img:
+            img = img.convert("RGBA")
+            img.thumbnail((CELL, CELL))
+            x = slot % PER_ROW * CELL + (CELL - img.width) // 2
+            y = slot // PER_ROW * CELL + (CELL - img.height) // 2
+            sheet.paste(img, (x, y))
+    out = io.BytesIO()
+    sheet.save(out, "PNG", optimize=True)
+    return out.getvalue(), sheet.size
+
+
+def build_atlases(kinds=("front_default",), force=False):
+    """Pack cached sprites into spritesheets plus a JSON coordinate index.
+
+    Only atlases whose source sprites changed are re-rendered. Returns the
+    per-atlas report rows.
+    """
+    old = read_index() or {}
+    old_atlases = old.get("atlases", {})
+    index = {"version": INDEX_VERSION, "cell": CELL, "atlases": {}, "sprites": {}, "names": {}}
+    report = []
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+
+    # Keep atlases of kinds we aren't rebuilding this time
+    for kind, cells in old.get("sprites", {}).items():
+        if kind not in kinds:
+            index["sprites"][kind] = cells
+            for key in {cell[0] for cell in cells.values()}:
+                index["atlases"][key] = old_atlases[key]
+    index["names"].update(old.get("names", {}))
+
+    db = Session()
+    for kind in kinds:
+        groups = defaultdict(list)
+        for member in _sources(db, kind):
+            groups[(member[0] - 1) // PER_ATLAS].append(member)
+            index["names"][member[1]] = member[0]
+
+        for n, members in sorted(groups.items()):
+            members.sort()
+            key = f"{kind}-{n}"
+            source_hash = hashlib.sha256(
+                "".join(f"{pid}:{digest};" for pid, _, digest, _ in members).encode()
+            ).hexdigest()
+
+            prev = old_atlases.get(key)
+            if (not force and prev and prev["source_hash"] == source_hash
+                    and os.path.exists(os.path.join(ATLAS_DIR, prev["file"]))):
+                entry = prev
+                status = "unchanged"
+            else:
+                data, (width, height) = _render(members)
+                filename = f"{key}.{hashlib.sha256(data).hexdigest()[:12]}.png"
+                with open(os.path.join(ATLAS_DIR, filename), "wb") as f:
+                    f.write(data)
+                if prev and prev["file"] != filename:
+                    try:
+                        os.remove(os.path.join(ATLAS_DIR, prev["file"]))
+                    except FileNotFoundError:
+                        pass
+                entry = {
+                    "file": filename, "source_hash": source_hash, "bytes": len(data),
+                    "width": width, "height": height, "count": len(members),
+                }
+                status = "rebuilt"
+
+            index["atlases"][key] = entry
+            cells = index["sprites"].setdefault(kind, {})
+            for pid, *_ in members:
+                slot = (pid - 1) % PER_ATLAS
+                cells[str(pid)] = [key, slot % PER_ROW * CELL, slot // PER_ROW * CELL]
+            report.append((key, status, entry["count"], entry["bytes"]))
+    db.close()
+
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, INDEX_PATH)
+    return report
+
+
+def read_index():
+    try:
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+def _atlas_index():
+    """Current index, re-read at most every few seconds if the file changed."""
+    global _index, _index_checked, _index_mtime
+    now = time.monotonic()
+    if _index_checked is None or now - _index_checked > 5:
+        with _lock:
+            _index_checked = now
+            try:
+                mtime = os.stat(INDEX_PATH).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime != _index_mtime:
+                _index_mtime = mtime
+                _index = read_index()
+    return _index
+
+
+def atlas_version():
+    """Changes whenever the atlases are rebuilt; cache keys of pages that
+    embed atlas URLs include it, since rebuilds delete the old files."""
+    _atlas_index()
+    return _index_mtime
+
+
+def atlas_sprite(pokemon, size=CELL, kind="front_default"):
+    """Inline CSS that draws a Pokémon (id or name) from its atlas at size x size.
+
+    Returns "" if there's no atlas cell for it, so templates can fall back to <img>.
+    """
+    index = _atlas_index()
+    if not index:
+        return ""
+    pid = pokemon if isinstance(pokemon, int) else index["names"].get(pokemon)
+    cell = index["sprites"].get(kind, {}).get(str(pid))
+    if not cell:
+        return ""
+    key, x, y = cell
+    atlas = index["atlases"][key]
+    scale = size / index["cell"]
+    return (
+        f"width:{size}px;height:{size}px;"
+        f"background-image:url(/sprites/atlas/{atlas['file']});"
+        f"background-position:-{x * scale:g}px -{y * scale:g}px;"
+        f"background-size:{atlas['width'] * scale:g}px {atlas['height'] * scale:g}px"
+    )
+
+
+def atlas_file(name):
+    """Path of an atlas image for a /sprites/atlas/<name> request, or None."""
+    if not ATLAS_FILE_RE.match(name):
+        return None
+    path = os.path.join(ATLAS_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "build":
+        kinds = ["front_default"]
+        if "--shiny" in sys.argv:
+            kinds.append("front_shiny")
+        rows = build_atlases(kinds, force="--force" in sys.argv)
+        for key, status, count, size in rows:
+            print(f"{'🔨' if status == 'rebuilt' else '✅'} {key:<20} {count:>4} sprites {size / 1024:>8.1f} KB  {status}")
+        print(f"🎉 {len(rows)} atlases, {sum(r[3] for r in rows) / 1024:.1f} KB total")
+    else:
+        print("Usage: python atlas.py build [--shiny] [--force]")
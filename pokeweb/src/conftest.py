@@ -0,0 +1,9 @@
+"""Tests run offline against a throwaway DB, never the dev db.sqlite.
+
+Set before any test module imports models, which reads POKEPARTY_DB once.
+"""
+import os
+import tempfile
+
+os.environ["POKEPARTY_DB"] = os.path.join(tempfile.mkdtemp(prefix="pokeparty-test-"), "test.sqlite")
+os.environ["POKEPARTY_OFFLINE"] = "1"
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+
+from sqlalchemy.dialects.sqlite import insert
+
+from models import Session, GameState
+
+# "memory" keeps state in this process (fine for one worker);
+# "sqlite" shares it through the DB so any gunicorn worker can serve a round
+GAME_STORE = os.environ.get("POKEPARTY_GAME_STORE", "memory").lower()
+GAME_TTL = int(os.environ.get("POKEPARTY_GAME_TTL", 6 * 60 * 60))
+
+
+class MemoryGameStore:
+    """{(session_id, game): state} in a dict, with expired games swept lazily."""
+
+    def __init__(self, ttl=GAME_TTL, sweep_every=60):
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._games = {}
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+
+    def get(self, session_id, game):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._games.get((session_id, game))
+            if entry is None or entry[0] < now:
+                self._games.pop((session_id, game), None)
+                return None
+            return entry[1]
+
+    def set(self, session_id, game, state):
+        now = time.monotonic()
+        with self._lock:
+            self._games[(session_id, game)] = (now + self.ttl, state)
+            if now - self._swept > self.sweep_every:
+                self._swept = now
+                for key in [k for k, (exp, _) in self._games.items() if exp < now]:
+                    del self._games[key]
+
+    def delete(self, session_id, game):
+        with self._lock:
+            self._games.pop((session_id, game), None)
+
+    def __len__(self):
+        return len(self._games)
+
+
+class SQLiteGameStore:
+    """Game state in the game_state table, shared by every worker on the DB."""
+
+    def __init__(self, ttl=GAME_TTL, sweep_every=300):
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._swept = 0
+
+    def get(self, session_id, game):
+        db = Session()
+        state = (
+            db.query(GameState.state)
+            .filter_by(session_id=session_id, game=game)
+            .filter(GameState.expires_at >= time.time())
+            .scalar()
+        )
+        return json.loads(state) if state is not None else None
+
+    def set(self, session_id, game, state):
+        db = Session()
+        now = time.time()
+        values = {"state": json.dumps(state, separators=(",", ":")), "expires_at": now + self.ttl}
+        db.execute(
+            insert(GameState)
+            .values(session_id=session_id, game=game, **values)
+            .on_conflict_do_update(index_elements=[GameState.session_id, GameState.game], set_=values)
+        )
+        if now - self._swept > self.sweep_every:
+            self._swept = now
+            db.query(GameState).filter(GameState.expires_at < now).delete()
+        db.commit()
+
+    def delete(self, session_id, game):
+        db = Session()
+        db.query(GameState).filter_by(session_id=session_id, game=game).delete()
+        db.commit()
+
+
+def make_game_store(kind=GAME_STORE, ttl=GAME_TTL):
+    if kind == "sqlite":
+        return SQLiteGameStore(ttl)
+    if kind == "memory":
+        return MemoryGameStore(ttl)
+    raise ValueError(f"Unknown game store {kind!r} (use 'memory' or 'sqlite')")
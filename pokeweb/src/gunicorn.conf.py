@@ -0,0 +1,40 @@
+# gunicorn -c gunicorn.conf.py
+#
+# Workers are forked from a master that has already run create_app(), so the
+# type chart and Pokémon records are loaded once and shared copy-on-write.
+# `kill -HUP <master>` gracefully replaces the workers (new config/env); code
+# changes need a full restart because the app is preloaded.
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app()"
+bind = os.environ.get("POKEPARTY_BIND", "0.0.0.0:5000")
+
+# SQLite has a single writer, so a handful of processes with a few threads
+# each goes further than lots of workers
+workers = int(os.environ.get("POKEPARTY_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("POKEPARTY_THREADS", 4))
+worker_class = "gthread"
+
+preload_app = True
+timeout = int(os.environ.get("POKEPARTY_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap memory growth
+max_requests = int(os.environ.get("POKEPARTY_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the GC's way so collections in the
+    # workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from models import reinit_after_fork
+    reinit_after_fork()
@@ -0,0 +1,137 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from models import Session, Pokemon, PokemonRank, User, LeaderboardEntry, PokemonScore, bump_version, cache_version
+
+
+def leaderboard_version():
+    """Bumped by every score write; part of the cache key of leaderboard pages."""
+    return cache_version("leaderboard")
+
+
+def record_score(db, rank_id, user_id, username, pokemon_id, score):
+    """Apply one pokemon_rank write to the materialized leaderboard tables.
+
+    Call after the ranking is written, in the same transaction; doesn't
+    commit. The Pokémon's community total is recomputed from its own
+    rankings (an index range, not a scan) while we hold the write lock, so
+    concurrent workers can't leave it out of step.
+    """
+    poke = db.query(Pokemon.name, Pokemon.sprite_url).filter_by(id=pokemon_id).first()
+    if poke is None:
+        return
+    name, sprite_url = poke
+
+    db.execute(
+        insert(LeaderboardEntry)
+        .values(
+            rank_id=rank_id,
+            user_id=user_id,
+            username=username,
+            pokemon=name,
+            sprite_url=sprite_url,
+            score=score,
+        )
+        .on_conflict_do_update(
+            index_elements=[LeaderboardEntry.rank_id],
+            set_={"score": score, "sprite_url": sprite_url},
+        )
+    )
+
+    total, count = (
+        db.query(func.sum(PokemonRank.score), func.count(PokemonRank.id))
+        .filter(PokemonRank.pokemon_id == pokemon_id)
+        .one()
+    )
+    values = {"total": total, "count": count, "average": total / count, "sprite_url": sprite_url}
+    db.execute(
+        insert(PokemonScore)
+        .values(pokemon=name, **values)
+        .on_conflict_do_update(index_elements=[PokemonScore.pokemon], set_=values)
+    )
+    bump_version(db, "leaderboard")
+
+
+def top_scores(limit=100):
+    """Highest individual scores, straight off the score index."""
+    rows = (
+        Session().query(LeaderboardEntry)
+        .order_by(LeaderboardEntry.score.desc(), LeaderboardEntry.rank_id)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"username": r.username, "pokemon": r.pokemon, "sprite_url": r.sprite_url, "score": r.score}
+        for r in rows
+    ]
+
+
+def community_averages(limit=50):
+    """Pokémon with the best average score across all users."""
+    rows = (
+        Session().query(PokemonScore)
+        .filter(PokemonScore.count > 0)
+        .order_by(PokemonScore.average.desc(), PokemonScore.count.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"pokemon": r.pokemon, "sprite_url": r.sprite_url, "average": round(r.average, 1), "votes": r.count}
+        for r in rows
+    ]
+
+
+def user_top(user_id, limit=10):
+    """One user's highest-scored Pokémon, via the (user_id, score) index."""
+    rows = (
+        Session().query(LeaderboardEntry)
+        .filter(LeaderboardEntry.user_id == user_id)
+        .order_by(LeaderboardEntry.score.desc(), LeaderboardEntry.rank_id)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"username": r.username, "pokemon": r.pokemon, "sprite_url": r.sprite_url, "score": r.score}
+        for r in rows
+    ]
+
+
+def rebuild_leaderboard():
+    """Recompute both tables from pokemon_rank (for existing DBs or repairs)."""
+    db = Session()
+    db.query(LeaderboardEntry).delete()
+    db.query(PokemonScore).delete()
+
+    ranked = (
+        db.query(PokemonRank.id, PokemonRank.user_id, User.username,
+                 Pokemon.name, Pokemon.sprite_url, PokemonRank.score)
+        .join(User, User.id == PokemonRank.user_id)
+        .join(Pokemon, Pokemon.id == PokemonRank.pokemon_id)
+        .all()
+    )
+    db.bulk_insert_mappings(LeaderboardEntry, [
+        {"rank_id": i, "user_id": u, "username": un, "pokemon": n, "sprite_url": s, "score": sc}
+        for i, u, un, n, s, sc in ranked
+    ])
+
+    totals = (
+        db.query(Pokemon.name, Pokemon.sprite_url,
+                 func.sum(PokemonRank.score), func.count(PokemonRank.id))
+        .join(Pokemon, Pokemon.id == PokemonRank.pokemon_id)
+        .group_by(Pokemon.id)
+        .all()
+    )
+    db.bulk_insert_mappings(PokemonScore, [
+        {"pokemon": n, "sprite_url": s, "total": t, "count": c, "average": t / c}
+        for n, s, t, c in totals
+    ])
+    bump_version(db, "leaderboard")
+    db.commit()
+    return len(ranked)
+
+
+def ensure_leaderboard():
+    """Build the tables once for DBs that have rankings from before they existed."""
+    db = Session()
+    if db.query(LeaderboardEntry.rank_id).first() is None and db.query(PokemonRank.id).first() is not None:
+        rebuild_leaderboard()
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+
+# Per-request Server-Timing header (durations of db/upstream/render work)
+SERVER_TIMING = os.environ.get("POKEPARTY_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _labels(names, values):
+    # Every process (gunicorn worker) keeps its own counts, so each sample
+    # carries its pid; sum over pid for totals across workers
+    names = ("pid",) + tuple(names)
+    values = (os.getpid(),) + tuple(values)
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), "")}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = self.labels + ("le",)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), series):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+REQUEST_SECONDS = Histogram(
+    "pokeparty_request_duration_seconds", "Time to handle a request", ("endpoint", "method", "status"))
+DB_QUERIES = Counter("pokeparty_db_queries_total", "SQL statements executed", ("endpoint",))
+DB_SECONDS = Counter("pokeparty_db_query_seconds_total", "Time spent in SQL statements", ("endpoint",))
+RENDER_SECONDS = Histogram("pokeparty_render_duration_seconds", "Time to render a template", ("template",))
+UPSTREAM_SECONDS = Histogram(
+    "pokeparty_upstream_duration_seconds", "PokeAPI call latency", ("outcome",))
+UPSTREAM_WAIT_SECONDS = Counter(
+    "pokeparty_upstream_wait_seconds_total", "Time requests spent waiting on PokeAPI", ("endpoint",))
+
+METRICS = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, RENDER_SECONDS, UPSTREAM_SECONDS, UPSTREAM_WAIT_SECONDS]
+_collectors = []
+
+# Timings of the request being handled on this thread
+_local = threading.local()
+
+
+def current():
+    return getattr(_local, "timings", None)
+
+
+def _endpoint():
+    timings = current()
+    return timings["endpoint"] if timings else "background"
+
+
+def add_timing(kind, seconds):
+    """Charge `seconds` of db/upstream/render work to the current request."""
+    timings = current()
+    if timings is not None:
+        timings[kind] = timings.get(kind, 0.0) + seconds
+        timings[kind + "_n"] = timings.get(kind + "_n", 0) + 1
+
+
+def record_upstream(seconds, outcome):
+    UPSTREAM_SECONDS.observe(seconds, outcome)
+
+
+def record_upstream_wait(seconds):
+    add_timing("upstream", seconds)
+    UPSTREAM_WAIT_SECONDS.inc(seconds, _endpoint())
+
+
+def register_collector(fn):
+    """fn() -> iterable of (metric name, type, help, {labels}, value), read at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    """Everything in Prometheus text format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    # Samples of one metric have to be contiguous, whichever collector made them
+    families = {}
+    for fn in _collectors:
+        for name, kind, help, labels, value in fn():
+            family = families.setdefault(name, [f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+            family.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {float(value):g}")
+    for family in families.values():
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on `engine`."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        endpoint = _endpoint()
+        DB_QUERIES.inc(1, endpoint)
+        DB_SECONDS.inc(elapsed, endpoint)
+        add_timing("db", elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed_query(context):
+        # A statement that raised (e.g. an IntegrityError) never reaches after_cursor_execute
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def instrument_app(app):
+    """Request timing, template render timing and the optional Server-Timing header."""
+    from flask import before_render_template, request, template_rendered
+
+    @app.before_request
+    def _start_request():
+        _local.timings = {
+            "start": time.perf_counter(),
+            "endpoint": request.endpoint or "unmatched",
+        }
+
+    @app.after_request
+    def _finish_request(response):
+        timings = current()
+        if timings is None:
+            return response
+        elapsed = time.perf_counter() - timings["start"]
+        REQUEST_SECONDS.observe(elapsed, timings["endpoint"], request.method, response.status_code)
+        if SERVER_TIMING:
+            parts = [f"app;dur={elapsed * 1000:.1f}"]
+            for kind in ("db", "upstream", "render"):
+                if kind in timings:
+                    parts.append(f'{kind};dur={timings[kind] * 1000:.1f};desc="{timings[kind + "_n"]}x"')
+            response.headers["Server-Timing"] = ", ".join(parts)
+        return response
+
+    @app.teardown_request
+    def _clear_request(exc=None):
+        _local.timings = None
+
+    def _render_started(sender, template, context, **extra):
+        timings = current()
+        if timings is not None:
+            timings["render_start"] = time.perf_counter()
+
+    def _render_done(sender, template, context, **extra):
+        timings = current()
+        if timings is not None and "render_start" in timings:
+            elapsed = time.perf_counter() - timings.pop("render_start")
+            add_timing("render", elapsed)
+            RENDER_SECONDS.observe(elapsed, template.name)
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_done, app, weak=False)
@@ -0,0 +1,104 @@
+import json, sys
+from sqlalchemy import text
+from models import DB_PATH, Session, Pokemon, PokemonMove, PokemonStat, engine, init_db, upgrade_pokemon_rank
+from pokemon_data import PAGE_MOVES, store_pokemon
+from leaderboard import ensure_leaderboard, rebuild_leaderboard
+
+def normalize_pokemon(batch_size=100):
+    """Backfill the stat/type/sprite/move tables from existing data blobs."""
+    db = Session()
+    has_stats = db.query(PokemonStat.pokemon_id).filter(PokemonStat.pokemon_id == Pokemon.id)
+    ids = [
+        r[0] for r in
+        db.query(Pokemon.id)
+        .filter(Pokemon.data.isnot(None), ~has_stats.exists())
+        .order_by(Pokemon.id)
+        .all()
+    ]
+    print(f"🔧 Normalizing {len(ids)} Pokémon...")
+
+    for i in range(0, len(ids), batch_size):
+        chunk = ids[i:i + batch_size]
+        for poke in db.query(Pokemon).filter(Pokemon.id.in_(chunk)).all():
+            store_pokemon(db, json.loads(poke.data), poke, keep_blob=True)
+        db.commit()
+        print(f"✅ Normalized {min(i + batch_size, len(ids))}/{len(ids)}")
+
+    db.close()
+    print("🎉 Normalization complete!")
+
+def trim_moves():
+    """Drop stored moves past the first PAGE_MOVES (older DBs kept every move)."""
+    db = Session()
+    count = db.query(PokemonMove).filter(PokemonMove.position >= PAGE_MOVES).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+    if count:
+        print(f"✂️ Dropped {count} moves no page shows")
+    return count
+
+def slim_pokemon():
+    """Drop the raw JSON of every normalized Pokémon and unused moves, and VACUUM the DB."""
+    normalize_pokemon()
+    trim_moves()
+    db = Session()
+    has_stats = db.query(PokemonStat.pokemon_id).filter(PokemonStat.pokemon_id == Pokemon.id)
+    count = (
+        db.query(Pokemon)
+        .filter(Pokemon.data.isnot(None), has_stats.exists())
+        .update({Pokemon.data: None}, synchronize_session=False)
+    )
+    db.commit()
+    db.close()
+    print(f"🧹 Dropped {count} data blobs, vacuuming...")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+    print("🎉 Slimming complete!")
+
+def migrate_ranks():
+    """Re-key pokemon_rank by pokemon_id (see models.upgrade_pokemon_rank).
+
+    init-db already runs this, so normally there's nothing left to do here
+    except rebuilding the leaderboard.
+    """
+    result = upgrade_pokemon_rank(engine)
+    if result is None:
+        print("✅ pokemon_rank is already keyed by pokemon_id")
+    else:
+        migrated, unmatched, collapsed = result
+        print(f"✅ Migrated {migrated} rankings, {unmatched} unmatched left in pokemon_rank_legacy, "
+              f"{collapsed} duplicates collapsed")
+    print(f"🏆 Rebuilt leaderboard from {rebuild_leaderboard()} rankings")
+
+def init_database():
+    """Everything a DB needs before the app starts: tables, added columns,
+    the pokemon_rank upgrade, normalized rows for Pokémon stored only as
+    blobs (without the moves no page shows), and leaderboard tables for
+    older rankings. Safe to rerun."""
+    init_db()
+    normalize_pokemon()
+    trim_moves()
+    ensure_leaderboard()
+    Session.remove()
+    print(f"✅ Database ready at {DB_PATH}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        cmd = sys.argv[1].lower()
+        if cmd != 'init-db':
+            init_db()
+        if cmd == 'init-db':
+            init_database()
+        elif cmd == 'normalize':
+            normalize_pokemon()
+        elif cmd == 'slim':
+            slim_pokemon()
+        elif cmd == 'ranks':
+            migrate_ranks()
+        elif cmd == 'leaderboard':
+            print(f"🏆 Rebuilt leaderboard from {rebuild_leaderboard()} rankings")
+        else:
+            print("Unknown command. Use 'init-db', 'normalize', 'slim', 'ranks' or 'leaderboard'.")
+    else:
+        print("Specify a migration: 'init-db', 'normalize', 'slim', 'ranks' or 'leaderboard'.")
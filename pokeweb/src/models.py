@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import Column, Integer, String, Text, create_engine, ForeignKey
+from sqlalchemy import Column, Float, Integer, String, Text, create_engine, event, ForeignKey, Index, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import scoped_session, sessionmaker, relationship
+
+from metrics import instrument_engine
 
 Base = declarative_base()
 
@@ -10,7 +13,52 @@ class Pokemon(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False)
     sprite_url = Column(String)
-    data = Column(Text)
+    height = Column(Integer)
+    weight = Column(Integer)
+    species_url = Column(String)
+    fetched_at = Column(Float)  # unix time of the last PokeAPI fetch, NULL if unknown
+    data = Column(Text)  # raw PokeAPI JSON, may be NULL once slimmed (see migrate.py)
+
+    stats = relationship('PokemonStat', cascade='all, delete-orphan')
+    types = relationship('PokemonType', cascade='all, delete-orphan', order_by='PokemonType.slot')
+    sprites = relationship('PokemonSprite', cascade='all, delete-orphan', order_by='PokemonSprite.position')
+    moves = relationship('PokemonMove', cascade='all, delete-orphan', order_by='PokemonMove.position')
+
+class PokemonStat(Base):
+    __tablename__ = 'pokemon_stat'
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    name = Column(String, primary_key=True)  # hp, attack, ...
+    base_stat = Column(Integer, nullable=False)
+    __table_args__ = (Index('ix_pokemon_stat_name_base', 'name', 'base_stat'),)
+
+class PokemonType(Base):
+    __tablename__ = 'pokemon_type'
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    slot = Column(Integer, primary_key=True)
+    type_name = Column(String, nullable=False, index=True)
+
+class PokemonSprite(Base):
+    __tablename__ = 'pokemon_sprite'
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # path in the sprites dict, e.g. "other/home/front_default"
+    url = Column(String, nullable=False)
+
+class PokemonMove(Base):
+    __tablename__ = 'pokemon_move'
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+class PokemonSpecies(Base):
+    """Species data for a Pokémon plus its precomputed statsguess clues."""
+    __tablename__ = 'pokemon_species'
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    species_id = Column(Integer)
+    generation = Column(String, index=True)  # e.g. "generation-i"
+    evolution_chain_url = Column(String, index=True)
+    flavor_texts = Column(Text)  # JSON list of distinct English flavor texts
+    clues = Column(Text)  # JSON list, see pokemon_data.build_clues
 
 class User(Base):
     __tablename__ = 'user'
@@ -20,10 +68,73 @@ class User(Base):
 class PokemonRank(Base):
     __tablename__ = 'pokemon_rank'
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False)
     score = Column(Integer, nullable=False)
     user_id = Column(Integer, ForeignKey('user.id'))
     user = relationship('User')
+    pokemon = relationship('Pokemon')
+    __table_args__ = (
+        Index('ux_pokemon_rank_user_pokemon', 'user_id', 'pokemon_id', unique=True),
+        Index('ix_pokemon_rank_pokemon', 'pokemon_id'),
+        Index('ix_pokemon_rank_score', 'score'),
+    )
+
+class LeaderboardEntry(Base):
+    """Denormalized copy of a PokemonRank row, kept in sync on every score write."""
+    __tablename__ = 'leaderboard_entry'
+    rank_id = Column(Integer, ForeignKey('pokemon_rank.id'), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    username = Column(String, nullable=False)
+    pokemon = Column(String, nullable=False)
+    sprite_url = Column(String)
+    score = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index('ix_leaderboard_score', 'score'),
+        Index('ix_leaderboard_user_score', 'user_id', 'score'),
+    )
+
+class PokemonScore(Base):
+    """Running community total/count/average score per Pokémon."""
+    __tablename__ = 'pokemon_score'
+    pokemon = Column(String, primary_key=True)
+    sprite_url = Column(String)
+    total = Column(Integer, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    average = Column(Float, nullable=False, default=0, index=True)
+
+class SpriteFile(Base):
+    """Upstream sprite URL -> content hash of its copy in the local sprite cache."""
+    __tablename__ = 'sprite_file'
+    url = Column(String, primary_key=True)
+    digest = Column(String, nullable=False, index=True)  # sha256 hex
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+
+class GameState(Base):
+    """Server-side state of one in-progress game, keyed by the browser's game session id."""
+    __tablename__ = 'game_state'
+    session_id = Column(String, primary_key=True)
+    game = Column(String, primary_key=True)
+    state = Column(Text, nullable=False)  # small JSON dict, e.g. Pokémon ids
+    expires_at = Column(Float, nullable=False, index=True)
+
+class CacheVersion(Base):
+    """A counter bumped whenever some cached data changes (e.g. "leaderboard"),
+    so every worker can tell its cached pages are out of date."""
+    __tablename__ = 'cache_version'
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+def bump_version(db, name):
+    """Mark data cached from `name` (e.g. "leaderboard") as stale. Doesn't commit."""
+    db.execute(
+        sqlite_insert(CacheVersion)
+        .values(name=name, version=1)
+        .on_conflict_do_update(index_elements=[CacheVersion.name], set_={"version": CacheVersion.version + 1})
+    )
+
+def cache_version(name):
+    return Session().query(CacheVersion.version).filter_by(name=name).scalar() or 0
 
 class TypeInfo(Base):
     __tablename__ = 'type_info'
@@ -33,11 +144,125 @@ class TypeInfo(Base):
 
 # 🔧 Path setup
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "db.sqlite")
+DB_PATH = os.environ.get("POKEPARTY_DB", os.path.join(BASE_DIR, "db.sqlite"))
+
+# SQLite tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",       # readers don't block the writer
+    "busy_timeout": 5000,        # ms to wait on a lock instead of "database is locked"
+    "synchronous": "NORMAL",     # safe with WAL, one fsync per checkpoint instead of per commit
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,        # 16MB page cache
+}
+
+def make_engine(path=DB_PATH):
+    # ✅ Force the full path inside the container (important for Docker)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        pool_size=int(os.environ.get("POKEPARTY_DB_POOL", 10)),
+        max_overflow=int(os.environ.get("POKEPARTY_DB_OVERFLOW", 10)),
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+    instrument_engine(engine)
+    return engine
+
+engine = make_engine()
+
+# Columns added after the first release; create_all won't touch existing tables
+ADDED_COLUMNS = {
+    'pokemon': {'height': 'INTEGER', 'weight': 'INTEGER', 'species_url': 'VARCHAR', 'fetched_at': 'FLOAT'},
+}
+# SQL for what NULLs in an added column should become (run on every init_db)
+BACKFILLS = {
+    # Rows from before fetched_at count as fetched at the upgrade, so they
+    # aren't all revalidated on their next view
+    ('pokemon', 'fetched_at'): "CAST(strftime('%s', 'now') AS REAL)",
+}
+
+def add_missing_columns(engine):
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {c['name'] for c in insp.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+        for (table, name), value in BACKFILLS.items():
+            conn.execute(text(f'UPDATE {table} SET {name} = {value} WHERE {name} IS NULL'))
+
+def upgrade_pokemon_rank(engine):
+    """Rebuild a pre-FK pokemon_rank (keyed by Pokémon name) as pokemon_id-keyed.
+
+    The old rows are kept in pokemon_rank_legacy; names that don't match a
+    Pokémon are left behind there, and duplicate (user, name) rows collapse
+    to the latest one. Returns (migrated, unmatched, collapsed) row counts,
+    or None if there was nothing to do.
+    """
+    columns = {c['name'] for c in inspect(engine).get_columns('pokemon_rank')}
+    if 'pokemon_id' in columns or 'name' not in columns:
+        return None
+
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS pokemon_rank_legacy'))
+        conn.execute(text('CREATE TABLE pokemon_rank_legacy AS SELECT * FROM pokemon_rank'))
+        conn.execute(text('DROP TABLE pokemon_rank'))
+        PokemonRank.__table__.create(conn)
+        migrated = conn.execute(text(
+            'INSERT INTO pokemon_rank (id, pokemon_id, score, user_id) '
+            'SELECT r.id, p.id, r.score, r.user_id FROM pokemon_rank_legacy r '
+            'JOIN pokemon p ON p.name = r.name '
+            'WHERE r.id IN (SELECT max(id) FROM pokemon_rank_legacy GROUP BY user_id, name)'
+        )).rowcount
+        unmatched = conn.execute(text(
+            'SELECT count(*) FROM pokemon_rank_legacy r '
+            'WHERE NOT EXISTS (SELECT 1 FROM pokemon p WHERE p.name = r.name)'
+        )).scalar()
+        total = conn.execute(text('SELECT count(*) FROM pokemon_rank_legacy')).scalar()
+        # Rank ids may have been collapsed; init_db rebuilds these right after
+        conn.execute(text('DELETE FROM leaderboard_entry'))
+        conn.execute(text('DELETE FROM pokemon_score'))
+    return migrated, unmatched, total - migrated - unmatched
+
+def init_db(engine=engine):
+    """Create missing tables and columns, and re-key a legacy pokemon_rank
+    (rebuilding the leaderboard tables the re-key empties).
+
+    Importing this module doesn't touch the schema; deploys run this once
+    through `python migrate.py init-db` (scripts that create a DB call it
+    themselves). Returns upgrade_pokemon_rank's result.
+    """
+    Base.metadata.create_all(engine)
+    add_missing_columns(engine)
+    migrated = upgrade_pokemon_rank(engine)
+    if migrated:
+        print(f"🔧 Re-keyed pokemon_rank by pokemon_id: {migrated[0]} migrated, "
+              f"{migrated[1]} unmatched left in pokemon_rank_legacy, {migrated[2]} duplicates collapsed")
+        from leaderboard import rebuild_leaderboard  # leaderboard imports this module
+        print(f"🏆 Rebuilt leaderboard from {rebuild_leaderboard()} rankings")
+    return migrated
+
+def schema_ready(engine=engine):
+    """Whether init_db has created every table (doesn't check columns)."""
+    return set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+
+# One session per thread; the web app calls Session.remove() when a request
+# ends, scripts close it themselves.
+Session = scoped_session(sessionmaker(bind=engine))
 
-# ✅ Force the full path inside the container (important for Docker)
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+def reinit_after_fork():
+    """Give a forked worker its own SQLite connections.
 
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+    Connections pooled in the parent are dropped without being closed, so the
+    parent's (and siblings') handles are left alone; new ones open on demand.
+    """
+    Session.remove()
+    engine.dispose(close=False)
 
@@ -0,0 +1,96 @@
+import difflib
+import re
+import threading
+import time
+
+from models import Session, Pokemon
+
+_SPECIAL = {"♀": "-f", "♂": "-m", "é": "e"}
+# What a PokeAPI name looks like once normalized: "pikachu", "ho-oh", "porygon-z"
+_NAME = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def normalize_name(name):
+    """How people type a name -> PokeAPI's spelling: "Mr. Mime" -> "mr-mime",
+    "Farfetch'd" -> "farfetchd", "Nidoran♀" -> "nidoran-f"."""
+    raw = str(name).strip().lower()
+    key = raw
+    for char, repl in _SPECIAL.items():
+        key = key.replace(char, repl)
+    key = re.sub(r"['.:]", "", key)
+    key = re.sub(r"[\s_-]+", "-", key)
+    # Dropping punctuation mustn't turn junk like "1." into an id
+    if key.isdigit() and key != raw:
+        return raw
+    return key
+
+
+def looks_like_name(key):
+    """Whether a normalized key could be a PokeAPI name (digits alone are ids, not names)."""
+    return bool(_NAME.fullmatch(key)) and not key.isdigit()
+
+
+class NameIndex:
+    """In-memory name -> id index of every Pokémon in the table.
+
+    Loaded with one query on first use and kept current with add(), so name
+    lookups and "did you mean" suggestions never need the DB or PokeAPI.
+    Also remembers when each Pokémon was last fetched, for revalidation.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.fetched_at = {}
+        self._names = None  # sorted name list for suggestions, rebuilt lazily
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        rows = Session().query(Pokemon.id, Pokemon.name, Pokemon.fetched_at).all()
+        with self._lock:
+            for poke_id, name, fetched_at in rows:
+                self.ids[name] = poke_id
+                if fetched_at:
+                    self.fetched_at[poke_id] = fetched_at
+            self._names = None
+            self._loaded = True
+        return len(rows)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def add(self, poke_id, name, fetched_at=None):
+        """Index a name (or alias) for an id; fetched_at if it was just fetched."""
+        with self._lock:
+            if name not in self.ids:
+                self._names = None
+            self.ids[name] = poke_id
+            if fetched_at is not None:
+                self.fetched_at[poke_id] = fetched_at
+
+    def lookup(self, name):
+        self._ensure_loaded()
+        return self.ids.get(name)
+
+    def pokemon_ids(self):
+        self._ensure_loaded()
+        return set(self.ids.values())
+
+    def suggest(self, name, count=3):
+        """Closest known names to a misspelt one."""
+        self._ensure_loaded()
+        names = self._names
+        if names is None:
+            with self._lock:
+                names = self._names = sorted(self.ids)
+        return difflib.get_close_matches(name, names, n=count, cutoff=0.7)
+
+    def age(self, poke_id):
+        """Seconds since a Pokémon was fetched from PokeAPI (0 if unknown, so
+        rows from before fetched_at existed aren't all refreshed at once)."""
+        fetched_at = self.fetched_at.get(poke_id)
+        return time.time() - fetched_at if fetched_at else 0
+
+    def __len__(self):
+        return len(self.ids)
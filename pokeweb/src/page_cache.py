@@ -0,0 +1,59 @@
+import hashlib
+import os
+
+from flask import Response, request
+
+from cache import LRUCache
+from models import DB_PATH
+
+# Rendered pages kept per worker, keyed by route plus whatever they depend on
+PAGE_CACHE_ENTRIES = int(os.environ.get("POKEPARTY_PAGE_CACHE_ENTRIES", 256))
+PAGE_CACHE_BYTES = int(os.environ.get("POKEPARTY_PAGE_CACHE_BYTES", 8 * 1024 * 1024))
+
+# Compiled Jinja templates, kept on disk so restarts skip compiling (set to "" to disable)
+TEMPLATE_CACHE_DIR = os.environ.get(
+    "POKEPARTY_TEMPLATE_CACHE", os.path.join(os.path.dirname(DB_PATH), "template_cache")
+)
+
+_pages = LRUCache(
+    max_entries=PAGE_CACHE_ENTRIES, max_bytes=PAGE_CACHE_BYTES,
+    sizeof=lambda entry: len(entry[1]) + 100,
+)
+
+
+def enable_bytecode_cache(app, directory=TEMPLATE_CACHE_DIR):
+    """Have Jinja load compiled templates from `directory` (shared by all workers)."""
+    if not directory:
+        return None
+    from jinja2 import FileSystemBytecodeCache
+
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    return directory
+
+
+def cached_page(key, render):
+    """The HTML `render()` returns, rendered once per `key`.
+
+    Put everything the page depends on in the key (e.g. a data version), so
+    a changed page gets a new entry. The ETag is a hash of the body: a
+    matching If-None-Match gets a 304 and the browser revalidates every time.
+    """
+    entry = _pages.get(key)
+    if entry is None:
+        body = render().encode("utf-8")
+        entry = (hashlib.sha1(body).hexdigest()[:20], body)
+        _pages.put(key, entry)
+    etag, body = entry
+    resp = Response(body, mimetype="text/html")
+    resp.set_etag(etag)
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+
+def page_cache_stats():
+    return _pages.stats()
+
+
+def clear_page_cache():
+    _pages.clear()
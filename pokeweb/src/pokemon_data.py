@@ -1,18 +1,52 @@
 # utils.py
 import json
-from models import Session, Pokemon, PokemonRank, TypeInfo
-import requests
-import random
+import os
+import threading
+import time
+from cache import LRUCache
+from models import (
+    Session, Pokemon, PokemonRank,
+    PokemonStat, PokemonType, PokemonSprite, PokemonMove, PokemonSpecies,
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from type_chart import TYPE_NAMES, get_type_chart
+from leaderboard import record_score
+from metrics import record_upstream_wait
+from name_index import NameIndex, looks_like_name, normalize_name
+from snapshot import SNAPSHOT_PATH, Snapshot, SnapshotError, db_fingerprint
+from upstream import UpstreamClient
 
-# Canonical list of standard Pokemon types (Gen 6+)
-TYPE_NAMES = [
-    "normal", "fire", "water", "electric", "grass", "ice",
-    "fighting", "poison", "ground", "flying", "psychic", "bug",
-    "rock", "ghost", "dragon", "dark", "steel", "fairy",
-]
-
-def extract_sprite(pokemon_data):
-    return pokemon_data['sprites']['front_default']
+# Set POKEPARTY_OFFLINE=1 on production nodes so lookups never leave the box:
+# anything not in the seeded Pokemon table is simply reported as missing.
+OFFLINE_ONLY = os.environ.get("POKEPARTY_OFFLINE", "").lower() in ("1", "true", "yes")
+
+# Point at a local fixture server in tests/benchmarks
+POKEAPI_URL = os.environ.get("POKEAPI_URL", "https://pokeapi.co/api/v2").rstrip("/")
+
+# Pooled client with timeouts, a circuit breaker and request coalescing
+pokeapi = UpstreamClient()
+
+# Decoded records, keyed by Pokémon id (bounded by count and approx bytes)
+RECORD_CACHE_ENTRIES = int(os.environ.get("POKEPARTY_CACHE_ENTRIES", 2048))
+RECORD_CACHE_BYTES = int(os.environ.get("POKEPARTY_CACHE_BYTES", 16 * 1024 * 1024))
+
+# Names PokeAPI confirmed don't exist are answered locally for this long
+NOT_FOUND_TTL = int(os.environ.get("POKEPARTY_NOT_FOUND_TTL", 60 * 60))
+# Lookups that miss the local DB may reach PokeAPI at most this often (per second, per process)
+UNKNOWN_LOOKUP_RATE = float(os.environ.get("POKEPARTY_UNKNOWN_LOOKUP_RATE", 2))
+UNKNOWN_LOOKUP_BURST = int(os.environ.get("POKEPARTY_UNKNOWN_LOOKUP_BURST", 10))
+# Cached Pokémon older than this are served as-is and refreshed in the background (0 = never)
+REVALIDATE_AFTER = int(os.environ.get("POKEPARTY_REVALIDATE_AFTER", 30 * 24 * 60 * 60))
+
+# Moves shown on a Pokémon's page; only these are stored in pokemon_move
+PAGE_MOVES = 5
+
+# PokeAPI order of base stats, used to keep pages stable when reading from SQL
+STAT_ORDER = {name: i for i, name in enumerate(
+    ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+)}
 
 def extract_sprites(data):
     sprites = []
@@ -33,30 +67,148 @@ def extract_types(pokemon_data):
 def extract_stats(pokemon_data):
     return {stat['stat']['name']: stat['base_stat'] for stat in pokemon_data['stats']}
 
-def extract_moves(pokemon_data, count=5):
+def extract_moves(pokemon_data, count=PAGE_MOVES):
     return [m['move']['name'] for m in pokemon_data['moves'][:count]]
 
-def get_random_pokemon_id(max_id=1025):
-    """Return a random Pokémon ID up to max_id."""
-    return random.randint(1, max_id)
+def extract_sprite_paths(data):
+    """Like extract_sprites, but returns (path, url) pairs, e.g. ("other/home/front_default", url)."""
+    sprites = []
+
+    def find_images(obj, path):
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                find_images(v, path + [k])
+        elif isinstance(obj, str) and obj.startswith("http"):
+            sprites.append(("/".join(path), obj))
+
+    find_images(data["sprites"], [])
+    return sprites
+
+class PokemonRecord:
+    """Compact projection of a Pokémon holding only what the pages use.
+
+    Records are shared through the cache, so treat them as read-only.
+    """
+    __slots__ = (
+        "id", "name", "sprite", "shiny_sprite", "sprites", "types", "stats",
+        "moves", "height", "weight", "species_url",
+    )
+
+    def __init__(self, id, name, sprite, shiny_sprite, sprites, types, stats,
+                 moves, height, weight, species_url):
+        self.id = id
+        self.name = name
+        self.sprite = sprite
+        self.shiny_sprite = shiny_sprite
+        self.sprites = sprites
+        self.types = types
+        self.stats = stats
+        self.moves = moves
+        self.height = height
+        self.weight = weight
+        self.species_url = species_url
+
+    @classmethod
+    def from_data(cls, data):
+        """Build from a raw PokeAPI blob."""
+        return cls(
+            data["id"],
+            data["name"],
+            data["sprites"].get("front_default"),
+            data["sprites"].get("front_shiny"),
+            extract_sprites(data),
+            extract_types(data),
+            extract_stats(data),
+            extract_moves(data),
+            data.get("height"),
+            data.get("weight"),
+            (data.get("species") or {}).get("url"),
+        )
+
+    @classmethod
+    def from_row(cls, poke):
+        """Build from a Pokemon row and its normalized stat/type/sprite/move rows."""
+        sprites = {s.kind: s.url for s in poke.sprites}
+        stats = sorted(poke.stats, key=lambda s: STAT_ORDER.get(s.name, len(STAT_ORDER)))
+        return cls(
+            poke.id,
+            poke.name,
+            sprites.get("front_default", poke.sprite_url),
+            sprites.get("front_shiny"),
+            [s.url for s in poke.sprites],
+            [t.type_name for t in poke.types],
+            {s.name: s.base_stat for s in stats},
+            [m.name for m in poke.moves[:PAGE_MOVES]],
+            poke.height,
+            poke.weight,
+            poke.species_url,
+        )
+
+_record_cache = LRUCache(max_entries=RECORD_CACHE_ENTRIES, max_bytes=RECORD_CACHE_BYTES)
+_names = NameIndex()  # every name/alias in the pokemon table -> id
+_not_found = LRUCache(max_entries=10000, max_bytes=2 * 1024 * 1024)  # key -> expiry time
+_revalidating = set()
+_snapshot = None  # mmap'd Pokédex (see load_snapshot), checked after the record cache
+_lookup_lock = threading.Lock()
+_lookup_budget = [UNKNOWN_LOOKUP_BURST, time.monotonic()]  # token bucket: tokens, updated
+
+MAX_POKEMON_ID = 1025
+# Numeric keys above this can't be a Pokémon (PokeAPI's ids, forms included, are far smaller)
+MAX_ID_KEY = 100000
+
+# National dex id ranges per generation
+GENERATIONS = {
+    1: (1, 151), 2: (152, 251), 3: (252, 386), 4: (387, 493), 5: (494, 649),
+    6: (650, 721), 7: (722, 809), 8: (810, 905), 9: (906, 1025),
+}
+
+def playable_pokemon_ids(offline=None, max_id=MAX_POKEMON_ID):
+    """Ids the random games deal from: the whole national dex, or offline
+    only the ones in the local table (all of them if nothing is seeded yet)."""
+    if offline is None:
+        offline = OFFLINE_ONLY
+    if offline:
+        seeded = sorted(i for i in _names.pokemon_ids() if i <= max_id)
+        if seeded:
+            return seeded
+    return list(range(1, max_id + 1))
+
+def parse_pokemon_id(value):
+    """A Pokémon id from user input ("25" or 25) in 1..MAX_ID_KEY, else None.
+
+    Only ASCII decimal strings count, so "²" or a 30-digit number is just an
+    unknown key rather than a crash.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        poke_id = value
+    elif isinstance(value, str) and value.isascii() and value.isdecimal() and len(value) <= 6:
+        poke_id = int(value)
+    else:
+        return None
+    return poke_id if 1 <= poke_id <= MAX_ID_KEY else None
+
+def pokemon_url(name_or_id):
+    return f'{POKEAPI_URL}/pokemon/{str(name_or_id).strip().lower()}'
 
 def fetch_pokemon(name_or_id):
     """Fetch Pokémon data from API (by name or ID). Returns JSON or None."""
-    url = f'https://pokeapi.co/api/v2/pokemon/{name_or_id}'
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    return response.json()
+    return pokeapi.get_json(pokemon_url(name_or_id))
 
 def fetch_species(url):
     """Fetch Pokémon species data from a given URL. Returns JSON or {}."""
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    return {}
+    return pokeapi.get_json(url) or {}
+
+async def fetch_pokemon_async(name_or_id):
+    """asyncio version of fetch_pokemon, sharing its pool and in-flight requests."""
+    return await pokeapi.aget_json(pokemon_url(name_or_id))
+
+async def fetch_species_async(url):
+    return await pokeapi.aget_json(url) or {}
 
 def get_type_matchups(type_name):
-    """Return key type matchups for a given type from local DB only.
+    """Return key type matchups for a given type from the in-memory type chart.
 
     Output keys:
       - weak_to:        set of types this type takes 2x from
@@ -66,82 +218,461 @@ def get_type_matchups(type_name):
       - resist_to:      set of types this type deals 0.5x to
       - immune_to:      set of types this type deals 0x to
     """
+    return get_type_chart().matchups(type_name)
+
+def get_type_effectiveness(defending_types):
+    """{attacking type: multiplier} against a single or dual typing."""
+    return get_type_chart().defense_map(defending_types)
+
+def store_pokemon(db, data, poke=None, keep_blob=False, fetched_at=None):
+    """Insert or refresh a Pokemon row and its normalized stat/type/sprite/move rows.
+
+    Doesn't commit. Pages only read the normalized rows (and the first
+    PAGE_MOVES moves), so the raw JSON is kept only with keep_blob=True.
+    fetched_at is when `data` came from PokeAPI (left as is if None).
+    """
+    if poke is None:
+        poke = db.get(Pokemon, data["id"])
+    if poke is None:
+        poke = Pokemon(id=data["id"])
+        db.add(poke)
+
+    poke.name = data["name"]
+    poke.sprite_url = data["sprites"]["front_default"]
+    poke.height = data.get("height")
+    poke.weight = data.get("weight")
+    poke.species_url = (data.get("species") or {}).get("url")
+    if fetched_at is not None:
+        poke.fetched_at = fetched_at
+    poke.data = json.dumps(data) if keep_blob else None
+    poke.stats = [
+        PokemonStat(name=s["stat"]["name"], base_stat=s["base_stat"])
+        for s in data["stats"]
+    ]
+    poke.types = [
+        PokemonType(slot=t.get("slot", i + 1), type_name=t["type"]["name"])
+        for i, t in enumerate(data["types"])
+    ]
+    poke.sprites = [
+        PokemonSprite(position=i, kind=kind, url=url)
+        for i, (kind, url) in enumerate(extract_sprite_paths(data))
+    ]
+    poke.moves = [
+        PokemonMove(position=i, name=m["move"]["name"])
+        for i, m in enumerate(data["moves"][:PAGE_MOVES])
+    ]
+    return poke
+
+def _find_pokemon(db, key):
+    if key.isdigit():
+        poke_id = parse_pokemon_id(key)
+        return db.get(Pokemon, poke_id) if poke_id else None
+    return db.query(Pokemon).filter_by(name=key).first()
+
+def _known_missing(key):
+    expires = _not_found.get(key)
+    if expires is None:
+        return False
+    if expires > time.time():
+        return True
+    _not_found.pop(key)
+    return False
+
+def _allow_upstream_lookup():
+    """Token bucket for lookups the local DB can't answer, so scans of random
+    names can't turn into a stream of PokeAPI calls."""
+    with _lookup_lock:
+        tokens, updated = _lookup_budget
+        now = time.monotonic()
+        tokens = min(UNKNOWN_LOOKUP_BURST, tokens + (now - updated) * UNKNOWN_LOOKUP_RATE)
+        allowed = tokens >= 1
+        _lookup_budget[:] = [tokens - allowed, now]
+    return allowed
+
+def _fetch_and_store(db, key, poke=None):
+    """Fetch from the API and write back. Another worker may have stored it
+    in the meantime, which is fine. A confirmed 404 is remembered for
+    NOT_FOUND_TTL seconds."""
+    status, data = pokeapi.get(pokemon_url(key))
+    if status == 404:
+        _not_found.put(key, time.time() + NOT_FOUND_TTL)
+    if not data:
+        return None
+    # The row is found by the canonical id, so an alias can't collide with it
+    fetched_at = time.time()
+    store_pokemon(db, data, poke if poke and poke.id == data["id"] else None, fetched_at=fetched_at)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    _names.add(data["id"], data["name"], fetched_at)
+    return data
+
+def get_pokemon_record(name_or_id, offline=None):
+    """Return a cached PokemonRecord by name, alias or ID, hitting the DB only on a miss.
+
+    Names are resolved through the in-memory name index. Anything the DB
+    doesn't have goes to PokeAPI only if it isn't a recent confirmed 404 and
+    the unknown-lookup budget allows it. Records older than REVALIDATE_AFTER
+    are returned straight away and refreshed in the background.
+    """
+    if offline is None:
+        offline = OFFLINE_ONLY
+
+    key = normalize_name(name_or_id)
+    if key.isdigit():
+        poke_id = parse_pokemon_id(key)
+        if poke_id is None:
+            return None  # "0", "²" or a number far past any id
+    else:
+        poke_id = _names.lookup(key)
+    record = _memory_record(poke_id)
+    if record:
+        _maybe_revalidate(record.id, offline)
+        return record
+    if poke_id is None and (not looks_like_name(key) or _known_missing(key)):
+        return None  # junk never reaches the DB or PokeAPI
+
     db = Session()
-    name = (type_name or '').lower()
-    row = db.query(TypeInfo).filter_by(name=name).first()
-    if not row:
-        return {k: set() for k in [
-            "weak_to", "strong_against", "resist_from", "immune_from", "resist_to", "immune_to"
-        ]}
-    payload = json.loads(row.data)
-    def to_set(key):
-        return set(payload.get(key, []) or [])
-    return {
-        "weak_to": to_set("weak_to"),
-        "strong_against": to_set("strong_against"),
-        "resist_from": to_set("resist_from"),
-        "immune_from": to_set("immune_from"),
-        "resist_to": to_set("resist_to"),
-        "immune_to": to_set("immune_to"),
-    }
-
-def get_or_cache_pokemon(name):
-    """Return Pokémon data from DB if cached, otherwise fetch + store it."""
-    db = Session()
-    name = name.lower()
-    poke = db.query(Pokemon).filter_by(name=name).first()
-
-    if poke:
-        return json.loads(poke.data)
-
-    data = fetch_pokemon(name)
-    if not data:
-        return None
+    poke = _find_pokemon(db, str(poke_id or key))
+    if poke and poke.stats:
+        record = PokemonRecord.from_row(poke)
+    elif poke and poke.data:
+        record = PokemonRecord.from_data(json.loads(poke.data))
+    elif offline or _known_missing(key) or not _allow_upstream_lookup():
+        return None
+    else:
+        data = _fetch_and_store(db, key, poke)
+        if not data:
+            return None
+        record = PokemonRecord.from_data(data)
+
+    _cache_record(record)
+    if not key.isdigit() and key != record.name:
+        _names.add(record.id, key)  # remember the alias
+    _maybe_revalidate(record.id, offline)
+    return record
+
+def suggest_pokemon_names(name, count=3):
+    """"Did you mean" candidates for a name that wasn't found."""
+    return _names.suggest(normalize_name(name), count)
+
+def _memory_record(poke_id):
+    """A record already in memory: the snapshot's, else the record cache's.
+
+    The snapshot is checked first, so each keeps its own hit rate; the
+    record cache only sees ids the snapshot doesn't have.
+    """
+    if _snapshot and poke_id:
+        record = _snapshot.get(poke_id)
+        if record:
+            return record
+    return _record_cache.get(poke_id)
+
+def _cache_record(record):
+    _record_cache.put(record.id, record)
+    _names.add(record.id, record.name)
+
+def _maybe_revalidate(poke_id, offline):
+    """Stale-while-revalidate: kick off a background refresh of an old record.
+
+    Refreshes spend the same token bucket as unknown-name lookups, so a burst
+    of views of old records can't turn into a burst of PokeAPI calls.
+    """
+    if offline or not REVALIDATE_AFTER or _names.age(poke_id) < REVALIDATE_AFTER:
+        return
+    if poke_id in _revalidating or not _allow_upstream_lookup():
+        return
+    with _lookup_lock:
+        if poke_id in _revalidating:
+            return
+        _revalidating.add(poke_id)
+    pokeapi.submit(pokemon_url(poke_id)).add_done_callback(lambda f: _revalidated(poke_id, f))
+
+def _revalidated(poke_id, future):
+    # Runs on a client thread, so it uses its own session rather than the scoped one
+    db = Session.session_factory()
+    try:
+        _, data = future.result()
+        if data:
+            fetched_at = time.time()
+            poke = db.get(Pokemon, poke_id)
+            store_pokemon(db, data, poke, keep_blob=bool(poke and poke.data), fetched_at=fetched_at)
+            db.commit()
+            _cache_record(PokemonRecord.from_data(data))
+            _names.add(poke_id, data["name"], fetched_at)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Revalidating Pokémon {poke_id} failed: {e}")
+    finally:
+        db.close()
+        with _lookup_lock:
+            _revalidating.discard(poke_id)
+
+def get_pokemon_records(ids, offline=None):
+    """Batch version of get_pokemon_record for a list of IDs.
+
+    Cache misses are loaded with a single IN (...) query (plus one selectin
+    query per child table); anything not in the DB is fetched concurrently
+    through the shared PokeAPI client and written back in one commit.
+    Returns records in the requested order, with None for IDs that couldn't
+    be found.
+    """
+    if offline is None:
+        offline = OFFLINE_ONLY
+
+    found = {}
+    for poke_id in ids:
+        record = _memory_record(poke_id)
+        if record:
+            found[poke_id] = record
+
+    missing = [i for i in dict.fromkeys(ids) if i not in found]
+    if missing:
+        db = Session()
+        rows = (
+            db.query(Pokemon)
+            .options(
+                selectinload(Pokemon.stats),
+                selectinload(Pokemon.types),
+                selectinload(Pokemon.sprites),
+                selectinload(Pokemon.moves),
+            )
+            .filter(Pokemon.id.in_(missing))
+            .all()
+        )
+        for poke in rows:
+            if poke.stats:
+                found[poke.id] = PokemonRecord.from_row(poke)
+            elif poke.data:
+                found[poke.id] = PokemonRecord.from_data(json.loads(poke.data))
+
+        to_fetch = [i for i in missing if i not in found]
+        if to_fetch and not offline:
+            start = time.perf_counter()
+            futures = [pokeapi.submit(pokemon_url(i)) for i in to_fetch]
+            fetched = [d for _, d in (f.result() for f in futures) if d]
+            record_upstream_wait(time.perf_counter() - start)
+            fetched_at = time.time()
+            for data in fetched:
+                store_pokemon(db, data, fetched_at=fetched_at)
+                _names.add(data["id"], data["name"], fetched_at)
+                found[data["id"]] = PokemonRecord.from_data(data)
+            if fetched:
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+
+        for poke_id in missing:
+            if poke_id in found:
+                _cache_record(found[poke_id])
+
+    return [found.get(poke_id) for poke_id in ids]
+
+def pokemon_ids_of_type(type_name):
+    """IDs of every Pokémon with the given type (the snapshot's type index, or
+    an indexed lookup on pokemon_type)."""
+    if _snapshot:
+        return _snapshot.ids_of_type(type_name.lower())
+    db = Session()
+    rows = (
+        db.query(PokemonType.pokemon_id)
+        .filter(PokemonType.type_name == type_name.lower())
+        .order_by(PokemonType.pokemon_id)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+def top_pokemon_by_stat(stat_name, limit=50):
+    """[(id, name, base_stat)] of the Pokémon with the highest base stat."""
+    db = Session()
+    return [
+        tuple(r) for r in
+        db.query(Pokemon.id, Pokemon.name, PokemonStat.base_stat)
+        .join(PokemonStat, PokemonStat.pokemon_id == Pokemon.id)
+        .filter(PokemonStat.name == stat_name)
+        .order_by(PokemonStat.base_stat.desc(), Pokemon.id)
+        .limit(limit)
+        .all()
+    ]
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Map the Pokédex snapshot, if there is one and it matches the DB.
+
+    Returns the Snapshot, or None when records will come from the DB.
+    """
+    global _snapshot
+    snap = None
+    if path and os.path.exists(path):
+        try:
+            snap = Snapshot(path)
+        except (OSError, SnapshotError) as e:
+            print(f"⚠️ Ignoring Pokédex snapshot {path}: {e}")
+        else:
+            if snap.fingerprint != db_fingerprint(Session()):
+                print(f"⚠️ Pokédex snapshot {path} is stale, re-export it with: python seed.py snapshot")
+                snap = None
+    # A replaced snapshot stays mapped until the records using it are gone
+    _snapshot = snap
+    return snap
+
+def preload_pokemon_records(batch_size=200):
+    """Load the name index and every seeded Pokémon into the record cache.
+
+    With a snapshot loaded the records are already in memory, so only the
+    name index is built. Returns how many are available. Never fetches from
+    PokeAPI.
+    """
+    _names.load()
+    if _snapshot:
+        return len(_snapshot)
+    ids = [r[0] for r in Session().query(Pokemon.id).order_by(Pokemon.id).all()]
+    loaded = 0
+    for start in range(0, len(ids), batch_size):
+        records = get_pokemon_records(ids[start:start + batch_size], offline=True)
+        loaded += sum(1 for r in records if r)
+    return loaded
+
+def pokemon_cache_stats():
+    """Hit/miss/eviction counters and size of the decoded record cache."""
+    return _record_cache.stats()
+
+def snapshot_stats():
+    """Hit/miss counters and size of the loaded snapshot, or None."""
+    snap = _snapshot
+    return snap.stats() if snap else None
+
+def not_found_cache_stats():
+    """Counters of the confirmed-404 name cache."""
+    return _not_found.stats()
+
+def clear_pokemon_cache():
+    _record_cache.clear()
+    _not_found.clear()
 
-    new_poke = Pokemon(id=data['id'], name=name, data=json.dumps(data))
-    db.add(new_poke)
-    db.commit()
-    return data
-
-def build_clues(data, species):
-    """Construct a list of clues for statsguess game."""
-    stats = extract_stats(data)
-    height = data["height"]
-    weight = data["weight"]
-    types = [t['type']['name'] for t in data['types']]
-    generation = species.get("generation", {}).get("name")
-    desc = None
+def extract_flavor_texts(species):
+    """Distinct English flavor texts, with the line breaks PokeAPI embeds collapsed."""
+    texts = []
     for entry in species.get("flavor_text_entries", []):
         if entry["language"]["name"] == "en":
-            desc = entry["flavor_text"]
-            break
+            text = " ".join(entry["flavor_text"].split())
+            if text not in texts:
+                texts.append(text)
+    return texts
 
+def build_clues(poke, species):
+    """Construct a list of clues for statsguess game from a PokemonRecord."""
+    texts = extract_flavor_texts(species)
     return [
-        {"type": "stats", "value": stats},
-        {"type": "height", "value": height},
-        {"type": "weight", "value": weight},
-        {"type": "types", "value": types},
-        {"type": "generation", "value": generation},
-        {"type": "desc", "value": desc}
+        {"type": "stats", "value": poke.stats},
+        {"type": "height", "value": poke.height},
+        {"type": "weight", "value": poke.weight},
+        {"type": "types", "value": poke.types},
+        {"type": "generation", "value": species.get("generation", {}).get("name")},
+        {"type": "desc", "value": texts[0] if texts else None}
     ]
 
-def check_db_for_ranking(name):
+def store_species(db, poke, species):
+    """Upsert a Pokémon's species row and its precomputed clues. Doesn't commit."""
+    values = {
+        "species_id": species.get("id"),
+        "generation": species.get("generation", {}).get("name"),
+        "evolution_chain_url": (species.get("evolution_chain") or {}).get("url"),
+        "flavor_texts": json.dumps(extract_flavor_texts(species)),
+        "clues": json.dumps(build_clues(poke, species)),
+    }
+    db.execute(
+        insert(PokemonSpecies)
+        .values(pokemon_id=poke.id, **values)
+        .on_conflict_do_update(index_elements=[PokemonSpecies.pokemon_id], set_=values)
+    )
+
+def get_clues(poke, offline=None):
+    """statsguess clues for a PokemonRecord: one primary-key lookup once species are seeded.
+
+    Unseeded Pokémon fall back to a species fetch (stored for next time), or
+    offline to clues without generation/description.
+    """
+    if offline is None:
+        offline = OFFLINE_ONLY
+
     db = Session()
-    rank_entry = db.query(PokemonRank).filter_by(name=name).first()
-    if rank_entry:
-        return True, rank_entry.score
+    clues = db.query(PokemonSpecies.clues).filter_by(pokemon_id=poke.id).scalar()
+    if clues:
+        return json.loads(clues)
+    if offline or not poke.species_url:
+        return build_clues(poke, {})
+
+    species = fetch_species(poke.species_url)
+    if not species:
+        return build_clues(poke, {})
+    store_species(db, poke, species)
+    db.commit()
+    return build_clues(poke, species)
+
+def check_db_for_ranking(pokemon_id, user_id):
+    db = Session()
+    score = db.query(PokemonRank.score).filter_by(user_id=user_id, pokemon_id=pokemon_id).scalar()
+    if score is not None:
+        return True, score
     return False, None
 
-def update_ranking(name, score):
+def upsert_ranking(db, user_id, pokemon_id, score):
+    """Atomic INSERT ... ON CONFLICT (user_id, pokemon_id) DO UPDATE.
+
+    Returns the ranking's id. Doesn't commit.
+    """
+    return db.execute(
+        insert(PokemonRank)
+        .values(user_id=user_id, pokemon_id=pokemon_id, score=score)
+        .on_conflict_do_update(
+            index_elements=[PokemonRank.user_id, PokemonRank.pokemon_id],
+            set_={"score": score},
+        )
+        .returning(PokemonRank.id)
+    ).scalar_one()
+
+def update_ranking(user, pokemon_id, score):
+    """Save a user's score for a Pokémon and refresh the leaderboard.
+
+    Returns (old_score, score); old_score is None for a new ranking.
+    """
     db = Session()
-    rank_entry = db.query(PokemonRank).filter_by(name=name).first()
-    if rank_entry:
-        old_score = rank_entry.score
-        rank_entry.score = score
-        db.commit()
-        return old_score, score
-    else:
-        new_rank = PokemonRank(name=name, score=score)
-        db.add(new_rank)
-        db.commit()
-        return None, score
+    _, old_score = check_db_for_ranking(pokemon_id, user.id)
+    rank_id = upsert_ranking(db, user.id, pokemon_id, score)
+    record_score(db, rank_id, user.id, user.username, pokemon_id, score)
+    db.commit()
+    return old_score, score
+
+def update_rankings(user, scores):
+    """Save many {pokemon_id: score} rankings for one user in a single transaction."""
+    db = Session()
+    for pokemon_id, score in scores.items():
+        rank_id = upsert_ranking(db, user.id, pokemon_id, score)
+        record_score(db, rank_id, user.id, user.username, pokemon_id, score)
+    db.commit()
+
+def rankings_page(user_id, after=0, limit=60, generation=None, type_name=None, unranked=False):
+    """One keyset page of (id, name, sprite_url, score) for the rankings grid.
+
+    Only the three Pokémon columns are read, joined to this user's scores, with
+    the filters done in SQL. Returns (rows, next_after); next_after is None on
+    the last page.
+    """
+    db = Session()
+    query = (
+        db.query(Pokemon.id, Pokemon.name, Pokemon.sprite_url, PokemonRank.score)
+        .outerjoin(PokemonRank, (PokemonRank.pokemon_id == Pokemon.id) & (PokemonRank.user_id == user_id))
+        .filter(Pokemon.id > after)
+    )
+    if generation in GENERATIONS:
+        query = query.filter(Pokemon.id.between(*GENERATIONS[generation]))
+    if type_name:
+        query = query.filter(Pokemon.types.any(PokemonType.type_name == type_name.lower()))
+    if unranked:
+        query = query.filter(PokemonRank.id.is_(None))
+    rows = query.order_by(Pokemon.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
@@ -0,0 +1,159 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from models import Session
+from pokemon_data import get_clues, get_pokemon_records, playable_pokemon_ids
+
+# Ready rounds kept per game; the producer tops a queue up once it drops to REFILL_AT
+POOL_SIZE = int(os.environ.get("POKEPARTY_POOL_SIZE", 16))
+REFILL_AT = int(os.environ.get("POKEPARTY_POOL_REFILL", POOL_SIZE // 2))
+# POKEPARTY_POOLS=0 builds every round on the request path (no producer thread)
+POOLS_ENABLED = os.environ.get("POKEPARTY_POOLS", "1").lower() not in ("0", "false", "no")
+
+
+class IdSampler:
+    """Deals Pokémon ids from a shuffled deck, so no id repeats until every
+    playable id has been dealt. The deck is rebuilt from `source()` each time
+    it runs out, so newly seeded Pokémon join the next one."""
+
+    def __init__(self, source=playable_pokemon_ids):
+        self.source = source
+        self._deck = []
+        self._lock = threading.Lock()
+
+    def draw(self, count):
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                if not self._deck:
+                    playable = self.source()
+                    # Repeats only if there are fewer playable ids than asked for
+                    self._deck = [i for i in playable if i not in ids] or list(playable)
+                    random.shuffle(self._deck)
+                ids.append(self._deck.pop())
+        return ids
+
+
+def build_single(draw):
+    poke, = get_pokemon_records(draw(1))
+    return poke and {"name": poke.name, "id": poke.id, "sprite_url": poke.sprite}
+
+
+def build_statsguess(draw):
+    poke, = get_pokemon_records(draw(1))
+    return poke and {"name": poke.name, "sprite": poke.sprite, "clues": get_clues(poke)}
+
+
+def build_higherlower(draw):
+    # Two fresh ids; a game in progress keeps its own left Pokémon and uses the second
+    pokes = get_pokemon_records(draw(2))
+    return all(pokes) and {"ids": [p.id for p in pokes]}
+
+
+def make_build_rank(rank_size):
+    def build_rank(draw):
+        pokes = [p for p in get_pokemon_records(draw(rank_size)) if p]
+        return pokes and {"pokemon": [(p.name, p.sprite, p.shiny_sprite) for p in pokes]}
+    return build_rank
+
+
+class RoundPool:
+    """Bounded queues of ready-to-serve round payloads, one per game.
+
+    A daemon thread (started on first use, so it never crosses a fork) refills
+    any queue at or below `refill_at` back up to `size`. pop() never waits on
+    it: an empty queue counts as an underflow and the round is built inline.
+    Builders take a draw(n) function and return a payload, or a falsy value
+    if a Pokémon couldn't be loaded.
+    """
+
+    def __init__(self, builders, size=POOL_SIZE, refill_at=REFILL_AT, enabled=POOLS_ENABLED):
+        self.builders = builders
+        self.size = size
+        self.refill_at = refill_at
+        self.enabled = enabled and size > 0
+        self.samplers = {game: IdSampler() for game in builders}
+        self.queues = {game: deque() for game in builders}
+        self.counters = {
+            game: {"served": 0, "underflow": 0, "built": 0, "failed": 0} for game in builders
+        }
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _build(self, game, attempts=3):
+        for _ in range(attempts):
+            payload = self.builders[game](self.samplers[game].draw)
+            if payload:
+                self.counters[game]["built"] += 1
+                return payload
+            self.counters[game]["failed"] += 1
+        return None
+
+    def pop(self, game):
+        """A round for `game`, or None if one couldn't be built."""
+        if self.enabled:
+            self._ensure_started()
+        try:
+            payload = self.queues[game].popleft()
+        except IndexError:
+            payload = None
+            if self.enabled:
+                self.counters[game]["underflow"] += 1
+        if payload is None:
+            payload = self._build(game)
+        if payload is not None:
+            self.counters[game]["served"] += 1
+        if self.enabled and len(self.queues[game]) <= self.refill_at:
+            self._wake.set()
+        return payload
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="round-pool", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=5)
+            self._wake.clear()
+            try:
+                self.fill()
+            except Exception as e:  # keep producing; requests fall back to inline builds
+                print(f"⚠️ Round pool refill failed: {e}")
+                time.sleep(1)
+            finally:
+                Session.remove()
+
+    def fill(self):
+        """Top up every queue that's at or below its refill threshold."""
+        for game, queue in self.queues.items():
+            if len(queue) > self.refill_at:
+                continue
+            # Bounded attempts, so an unseeded offline DB doesn't spin
+            for _ in range(self.size - len(queue)):
+                payload = self._build(game, attempts=1)
+                if payload:
+                    queue.append(payload)
+
+    def stats(self):
+        return {
+            game: {"depth": len(self.queues[game]), "size": self.size, **self.counters[game]}
+            for game in self.queues
+        }
+
+
+def make_round_pool(rank_size, **kwargs):
+    return RoundPool({
+        "shadowsprite": build_single,
+        "guessfromid": build_single,
+        "rankrandom": build_single,
+        "statsguess": build_statsguess,
+        "higherlower": build_higherlower,
+        "rank": make_build_rank(rank_size),
+    }, **kwargs)
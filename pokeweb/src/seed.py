@@ -1,47 +1,246 @@
-import json, requests, sys
-from models import Session, Pokemon, TypeInfo
-from pokemon_data import TYPE_NAMES
+import argparse, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def seed_pokemon_db():
+import requests
+
+from models import Session, Pokemon, PokemonSpecies, PokemonSprite, SpriteFile, TypeInfo, bump_version, init_db
+from pokemon_data import (
+    GENERATIONS, TYPE_NAMES, MAX_POKEMON_ID, POKEAPI_URL, get_pokemon_records, store_pokemon, store_species,
+)
+from snapshot import SNAPSHOT_PATH, db_fingerprint, generation_number, write_snapshot
+from sprites import EXTENSIONS, store_sprite
+from type_chart import reload_type_chart
+from upstream import make_http_session
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_PATH = os.path.join(BASE_DIR, "seed_checkpoint.json")
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: at most `rate` requests per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def load_checkpoint(path=CHECKPOINT_PATH):
+    """IDs that failed on a previous run. Successful rows are committed per batch,
+    so the DB itself records how far an interrupted run got."""
+    if not os.path.exists(path):
+        return {"failed": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(failed, path=CHECKPOINT_PATH):
+    with open(path, "w") as f:
+        json.dump({"failed": sorted(failed), "updated": int(time.time())}, f)
+
+
+def seed_pokemon_db(start=1, end=MAX_POKEMON_ID, workers=8, rate=20, batch_size=50,
+                    base_url=POKEAPI_URL, retry_failed=False, checkpoint_path=CHECKPOINT_PATH):
     db = Session()
-    for poke_id in range(1, 1026):
-        url = f"https://pokeapi.co/api/v2/pokemon/{poke_id}"
-        resp = requests.get(url)
+    base_url = base_url.rstrip("/")
+
+    # One query for everything already seeded in the range
+    existing = {
+        r[0] for r in db.query(Pokemon.id).filter(Pokemon.id.between(start, end)).all()
+    }
+    checkpoint = load_checkpoint(checkpoint_path)
+    wanted = [i for i in range(start, end + 1) if i not in existing]
+    if retry_failed:
+        wanted = [i for i in wanted if i in set(checkpoint["failed"])]
+    print(f"🔎 {len(existing)} already seeded, fetching {len(wanted)}...")
+
+    http = make_http_session(pool_size=workers)
+    limiter = RateLimiter(rate)
+
+    def fetch(poke_id):
+        limiter.wait()
+        try:
+            resp = http.get(f"{base_url}/pokemon/{poke_id}", timeout=15)
+        except requests.RequestException as e:
+            print(f"❌ ID {poke_id}: {e}")
+            return poke_id, None
         if resp.status_code != 200:
+            return poke_id, None
+        return poke_id, resp.json()
+
+    # Earlier failures stay failed until they're in the DB, whatever range this run covers
+    failed = set(checkpoint["failed"])
+    failed -= {r[0] for r in db.query(Pokemon.id).filter(Pokemon.id.in_(failed)).all()}
+    pending = 0
+    done = 0
+
+    def store(future):
+        nonlocal pending, done
+        poke_id, data = future.result()
+        if not data:
             print(f"❌ Failed on ID {poke_id}")
-            continue
-
-        data = resp.json()
-        name = data["name"]
-        sprite_url = data["sprites"]["front_default"]
-
-        # Only insert if not already in DB
-        if not db.query(Pokemon).filter_by(id=poke_id).first():
-            poke = Pokemon(
-                id=poke_id,
-                name=name,
-                sprite_url=sprite_url,
-                data=json.dumps(data)
-            )
-            db.add(poke)
-
-        if poke_id % 50 == 0:
+            failed.add(poke_id)
+            return
+
+        # Writes stay on this thread; SQLite has a single writer anyway
+        poke = Pokemon(id=data["id"])
+        db.add(poke)
+        store_pokemon(db, data, poke, fetched_at=time.time())
+        failed.discard(poke_id)
+        pending += 1
+        done += 1
+
+        if pending >= batch_size:
             db.commit()
-            print(f"✅ Seeded {poke_id} Pokémon...")
+            pending = 0
+            print(f"✅ Seeded {done}/{len(wanted)} Pokémon...")
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = [pool.submit(fetch, poke_id) for poke_id in wanted]
+    stored = set()
+    try:
+        for future in as_completed(futures):
+            stored.add(future)
+            store(future)
+    except BaseException:
+        # e.g. Ctrl-C: drop the queued fetches, but keep what already arrived
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            if future.done() and not future.cancelled() and future not in stored:
+                store(future)
+        raise
+    finally:
+        pool.shutdown(wait=False)
+        db.commit()
+        db.close()
+        save_checkpoint(failed, checkpoint_path)
+
+    print(f"🎉 Seeding complete! {done} added, {len(failed)} failed.")
 
+
+def seed_sprites(all_sprites=False, workers=8, rate=20, batch_size=100):
+    """Download sprites into the local content-addressed cache.
+
+    By default only front_default/front_shiny (what the game pages use);
+    with all_sprites every URL in pokemon_sprite (the /pokemon/<name> gallery).
+    """
+    db = Session()
+    query = db.query(PokemonSprite.url)
+    if not all_sprites:
+        query = query.filter(PokemonSprite.kind.in_(["front_default", "front_shiny"]))
+    urls = {r[0] for r in query.all()}
+    urls |= {r[0] for r in db.query(Pokemon.sprite_url).filter(Pokemon.sprite_url.isnot(None)).all()}
+    urls -= {r[0] for r in db.query(SpriteFile.url).all()}
+    urls = sorted(urls)
+    print(f"🖼️  Fetching {len(urls)} sprites...")
+
+    http = make_http_session(pool_size=workers)
+    limiter = RateLimiter(rate)
+
+    def fetch(url):
+        limiter.wait()
+        try:
+            resp = http.get(url, timeout=15)
+        except requests.RequestException as e:
+            print(f"❌ {url}: {e}")
+            return url, None, None
+        content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+        if resp.status_code != 200 or content_type not in EXTENSIONS:
+            print(f"❌ {url}: {resp.status_code} {content_type}")
+            return url, None, None
+        return url, resp.content, content_type
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for url, content, content_type in pool.map(fetch, urls):
+            if content is None:
+                continue
+            store_sprite(db, url, content, content_type)
+            done += 1
+            if done % batch_size == 0:
+                db.commit()
+                print(f"✅ Cached {done}/{len(urls)} sprites...")
     db.commit()
     db.close()
-    print("🎉 Seeding complete!")
-    
+    print(f"🎉 Sprite cache complete! {done} added.")
 
-def seed_type_data():
+
+def seed_species(workers=8, rate=20, batch_size=50, base_url=POKEAPI_URL):
+    """Fetch species data (generation, flavor texts, evolution chain) for every
+    seeded Pokémon that doesn't have it yet, and precompute its statsguess clues."""
+    db = Session()
+    base_url = base_url.rstrip("/")
+    seeded = db.query(PokemonSpecies.pokemon_id)
+    rows = (
+        db.query(Pokemon.id, Pokemon.species_url)
+        .filter(Pokemon.id.not_in(seeded))
+        .order_by(Pokemon.id)
+        .all()
+    )
+    print(f"🔎 Fetching species for {len(rows)} Pokémon...")
+
+    http = make_http_session(pool_size=workers)
+    limiter = RateLimiter(rate)
+
+    def fetch(row):
+        poke_id, species_url = row
+        # Species ids differ from Pokémon ids for alternate forms
+        species_id = species_url.rstrip("/").rsplit("/", 1)[-1] if species_url else poke_id
+        limiter.wait()
+        try:
+            resp = http.get(f"{base_url}/pokemon-species/{species_id}", timeout=15)
+        except requests.RequestException as e:
+            print(f"❌ ID {poke_id}: {e}")
+            return poke_id, None
+        if resp.status_code != 200:
+            return poke_id, None
+        return poke_id, resp.json()
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            records = get_pokemon_records([r[0] for r in batch], offline=True)
+            for record, (poke_id, species) in zip(records, pool.map(fetch, batch)):
+                if not (record and species):
+                    print(f"❌ Failed on ID {poke_id}")
+                    failed += 1
+                    continue
+                store_species(db, record, species)
+                done += 1
+            db.commit()
+            print(f"✅ Seeded species for {done}/{len(rows)} Pokémon...")
+    db.close()
+    print(f"🎉 Species complete! {done} added, {failed} failed.")
+
+
+def seed_type_data(base_url=POKEAPI_URL):
     db = Session()
+    http = make_http_session()
+    base_url = base_url.rstrip("/")
+
     def names(arr):
         return [t.get('name') for t in (arr or [])]
 
+    rows = {r.name: r for r in db.query(TypeInfo).all()}
     for tname in TYPE_NAMES:
-        url = f"https://pokeapi.co/api/v2/type/{tname}"
-        resp = requests.get(url)
+        resp = http.get(f"{base_url}/type/{tname}", timeout=15)
         if resp.status_code != 200:
             print(f"Failed to fetch type {tname}: {resp.status_code}")
             continue
@@ -55,24 +254,72 @@ def seed_type_data():
             'resist_to': names(rel.get('half_damage_to')),
             'immune_to': names(rel.get('no_damage_to')),
         }
-        row = db.query(TypeInfo).filter_by(name=tname).first()
+        row = rows.get(tname)
         if row:
             row.data = json.dumps(payload)
         else:
-            row = TypeInfo(name=tname, data=json.dumps(payload))
-            db.add(row)
-        db.commit()
+            db.add(TypeInfo(name=tname, data=json.dumps(payload)))
         print(f"Seeded type {tname}")
+    # Running web workers rebuild their charts when they see this move
+    bump_version(db, "types")
+    db.commit()
     db.close()
+    reload_type_chart()
+
+
+def export_snapshot(path=SNAPSHOT_PATH, batch_size=200):
+    """Write every seeded Pokémon to the binary snapshot the app maps at startup.
+
+    Re-export after seeding: workers ignore a snapshot that no longer matches the DB.
+    """
+    db = Session()
+    fingerprint = db_fingerprint(db)
+    ids = [r[0] for r in db.query(Pokemon.id).order_by(Pokemon.id).all()]
+    generations = {
+        pid: generation_number(name)
+        for pid, name in db.query(PokemonSpecies.pokemon_id, PokemonSpecies.generation).all()
+    }
+    for gen, (first, last) in GENERATIONS.items():
+        for pid in range(first, last + 1):
+            generations[pid] = generations.get(pid) or gen
+
+    records = []
+    for start in range(0, len(ids), batch_size):
+        records.extend(r for r in get_pokemon_records(ids[start:start + batch_size], offline=True) if r)
+    db.close()
+
+    size = write_snapshot(path, records, generations, fingerprint)
+    print(f"📦 Wrote {len(records)} Pokémon to {path} ({size / 1024:.0f} KB)")
+
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        cmd = sys.argv[1].lower()
-        if cmd == 'pokemon':
-            seed_pokemon_db()
-        elif cmd == 'types':
-            seed_type_data()
-        else:
-            print("Unknown command. Use 'pokemon' or 'types'.")
+    parser = argparse.ArgumentParser(description="Seed the local Pokémon DB from PokeAPI.")
+    parser.add_argument("what", nargs="?", help="'pokemon', 'species', 'types', 'sprites' or 'snapshot'")
+    parser.add_argument("--base-url", default=POKEAPI_URL, help="PokeAPI base URL (e.g. a local fixture server)")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--end", type=int, default=MAX_POKEMON_ID)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20, help="max requests/second, 0 for unlimited")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--retry-failed", action="store_true", help="only retry IDs that failed last run")
+    parser.add_argument("--all-sprites", action="store_true", help="cache every sprite, not just front/shiny")
+    parser.add_argument("--out", default=SNAPSHOT_PATH, help="where 'snapshot' writes the Pokédex snapshot")
+    args = parser.parse_args()
+
+    if args.what:
+        init_db()
+    if not args.what:
+        print("Specify what to seed: 'pokemon', 'species', 'types', 'sprites' or 'snapshot'.")
+    elif args.what.lower() == 'pokemon':
+        seed_pokemon_db(args.start, args.end, args.workers, args.rate, args.batch_size,
+                        args.base_url, args.retry_failed)
+    elif args.what.lower() == 'species':
+        seed_species(args.workers, args.rate, args.batch_size, args.base_url)
+    elif args.what.lower() == 'types':
+        seed_type_data(args.base_url)
+    elif args.what.lower() == 'sprites':
+        seed_sprites(args.all_sprites, args.workers, args.rate)
+    elif args.what.lower() == 'snapshot':
+        export_snapshot(args.out)
     else:
-        print("Specify what to seed: 'pokemon' or 'types'.")
+        print("Unknown command. Use 'pokemon', 'species', 'types', 'sprites' or 'snapshot'.")
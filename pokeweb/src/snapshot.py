@@ -0,0 +1,269 @@
+import mmap
+import os
+import struct
+import threading
+
+from sqlalchemy import func
+
+from models import DB_PATH, Pokemon, PokemonSpecies
+
+# Read-only Pokédex written by `python seed.py snapshot` and mapped by every
+# worker (set to "" to always read Pokémon from the DB)
+SNAPSHOT_PATH = os.environ.get(
+    "POKEPARTY_SNAPSHOT", os.path.join(os.path.dirname(DB_PATH), "pokedex.snap")
+)
+
+MAGIC = b"PKDXSNAP"
+VERSION = 1
+NONE = 0xFFFFFFFF
+NO_STAT = 0xFFFF
+MAX_STATS = 6
+
+# Layout, all little-endian and fixed-size so records are read in place:
+#   header
+#   index    u32 per id 0..max_id: row number + 1 (0 = not in the snapshot)
+#   rows     ROW per Pokémon, in id order
+#   lists    u32 string ids (sprites, moves) and Pokémon ids (type index)
+#   types    TYPE_ENTRY per type: name, start/length of its ids in lists
+#   strings  u32 offsets (count + 1) into the UTF-8 blob that follows
+HEADER = struct.Struct(
+    "<8sHHII"   # magic, version, stat count, max id, row count
+    "IId"       # DB fingerprint: pokemon rows, species rows, newest fetched_at
+    "II"        # type count, string count
+    "IIIIIII"   # offsets: index, rows, lists, types, strings, blob; total size
+)
+ROW = struct.Struct(
+    "<IIIII"    # id, name, sprite, shiny sprite, species url (string ids)
+    "II"        # height, weight
+    "IH"        # sprites: start in lists, length
+    "IH"        # moves: start in lists, length
+    "II"        # type string ids, NONE if absent
+    "B"         # generation (0 = unknown)
+    + "H" * MAX_STATS
+)
+TYPE_ENTRY = struct.Struct("<III")
+
+_ROMAN = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def generation_number(name):
+    """"generation-iv" -> 4, None/unknown -> 0."""
+    if not name:
+        return 0
+    return _ROMAN.get(name.rsplit("-", 1)[-1], 0)
+
+
+def db_fingerprint(db):
+    """What the snapshot was exported from; a mismatch means it's stale."""
+    count, newest = db.query(func.count(Pokemon.id), func.max(Pokemon.fetched_at)).one()
+    species = db.query(func.count(PokemonSpecies.pokemon_id)).scalar()
+    return (count, species, float(newest or 0))
+
+
+def write_snapshot(path, records, generations, fingerprint):
+    """Write PokemonRecords (plus {id: generation number}) as a snapshot.
+
+    Written to a temp file and renamed, so running workers keep their
+    mapping of the old file.
+    """
+    records = sorted(records, key=lambda r: r.id)
+    strings, string_ids = [], {}
+
+    def sid(value):
+        if value is None:
+            return NONE
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    stat_names = []
+    for record in records:
+        for name in record.stats:
+            if name not in stat_names:
+                stat_names.append(name)
+    if len(stat_names) > MAX_STATS:
+        raise SnapshotError(f"too many stats: {stat_names}")
+    for name in stat_names:
+        sid(name)  # the first strings are the stat names
+
+    lists, rows, by_type = [], [], {}
+    for record in records:
+        sprites_start = len(lists)
+        lists.extend(sid(url) for url in record.sprites)
+        moves_start = len(lists)
+        lists.extend(sid(move) for move in record.moves)
+        types = list(record.types[:2]) + [None] * (2 - len(record.types[:2]))
+        for type_name in record.types:
+            by_type.setdefault(type_name, []).append(record.id)
+        stats = [record.stats.get(name, NO_STAT) for name in stat_names]
+        stats += [NO_STAT] * (MAX_STATS - len(stats))
+        rows.append(ROW.pack(
+            record.id, sid(record.name), sid(record.sprite), sid(record.shiny_sprite), sid(record.species_url),
+            NONE if record.height is None else record.height,
+            NONE if record.weight is None else record.weight,
+            sprites_start, len(record.sprites), moves_start, len(record.moves),
+            sid(types[0]), sid(types[1]),
+            generations.get(record.id, 0),
+            *stats,
+        ))
+
+    type_entries = []
+    for type_name in sorted(by_type):
+        type_entries.append(TYPE_ENTRY.pack(sid(type_name), len(lists), len(by_type[type_name])))
+        lists.extend(by_type[type_name])
+
+    max_id = records[-1].id if records else 0
+    index = [0] * (max_id + 1)
+    for row, record in enumerate(records):
+        index[record.id] = row + 1
+
+    blob = bytearray()
+    offsets = []
+    for value in strings:
+        offsets.append(len(blob))
+        blob += value.encode("utf-8")
+    offsets.append(len(blob))
+
+    index_off = HEADER.size
+    rows_off = index_off + 4 * len(index)
+    lists_off = rows_off + ROW.size * len(rows)
+    types_off = lists_off + 4 * len(lists)
+    strings_off = types_off + TYPE_ENTRY.size * len(type_entries)
+    blob_off = strings_off + 4 * len(offsets)
+    total = blob_off + len(blob)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, len(stat_names), max_id, len(rows), *fingerprint,
+            len(type_entries), len(strings),
+            index_off, rows_off, lists_off, types_off, strings_off, blob_off, total,
+        ))
+        f.write(struct.pack(f"<{len(index)}I", *index))
+        f.write(b"".join(rows))
+        f.write(struct.pack(f"<{len(lists)}I", *lists))
+        f.write(b"".join(type_entries))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(blob)
+    os.replace(tmp, path)
+    return total
+
+
+class Snapshot:
+    """A snapshot file mapped read-only.
+
+    The pages are shared by every process that maps the file; records are
+    small views that decode a field from the mapping when it's read. get()
+    keeps hit/miss counters, like cache.LRUCache.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError("empty file")
+        if len(self._map) < HEADER.size:
+            raise SnapshotError("truncated header")
+        (magic, version, self._stat_count, self.max_id, self.count,
+         pokemon_count, species_count, newest, type_count, self._string_count,
+         self._index_off, self._rows_off, self._lists_off, types_off, self._strings_off,
+         self._blob_off, total) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise SnapshotError("not a Pokédex snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"version {version}, expected {VERSION}")
+        if total != len(self._map):
+            raise SnapshotError(f"size {len(self._map)}, expected {total}")
+        self.fingerprint = (pokemon_count, species_count, newest)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.stat_names = [self.string(i) for i in range(self._stat_count)]
+        self._types = {}
+        for i in range(type_count):
+            name, start, length = TYPE_ENTRY.unpack_from(self._map, types_off + i * TYPE_ENTRY.size)
+            self._types[self.string(name)] = (start, length)
+
+    def __len__(self):
+        return self.count
+
+    def string(self, i):
+        if i == NONE:
+            return None
+        start, end = struct.unpack_from("<II", self._map, self._strings_off + 4 * i)
+        return self._map[self._blob_off + start:self._blob_off + end].decode("utf-8")
+
+    def ints(self, start, length):
+        return struct.unpack_from(f"<{length}I", self._map, self._lists_off + 4 * start)
+
+    def row(self, poke_id):
+        """Row number of a Pokémon id, or None."""
+        if not 0 < poke_id <= self.max_id:
+            return None
+        row = struct.unpack_from("<I", self._map, self._index_off + 4 * poke_id)[0]
+        return row - 1 if row else None
+
+    def get(self, poke_id):
+        row = self.row(poke_id)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        return SnapshotRecord(self, ROW.unpack_from(self._map, self._rows_off + row * ROW.size))
+
+    def stats(self):
+        """Same keys as LRUCache.stats(); nothing is ever evicted."""
+        with self._lock:
+            return {"entries": self.count, "bytes": len(self._map),
+                    "hits": self.hits, "misses": self.misses, "evictions": 0}
+
+    def ids(self):
+        return [ROW.unpack_from(self._map, self._rows_off + row * ROW.size)[0] for row in range(self.count)]
+
+    def ids_of_type(self, type_name):
+        start, length = self._types.get(type_name, (0, 0))
+        return list(self.ints(start, length))
+
+
+class SnapshotRecord:
+    """Same attributes as pokemon_data.PokemonRecord, read from a Snapshot."""
+    __slots__ = ("_snap", "_row")
+
+    def __init__(self, snap, row):
+        self._snap = snap
+        self._row = row
+
+    id = property(lambda self: self._row[0])
+    name = property(lambda self: self._snap.string(self._row[1]))
+    sprite = property(lambda self: self._snap.string(self._row[2]))
+    shiny_sprite = property(lambda self: self._snap.string(self._row[3]))
+    species_url = property(lambda self: self._snap.string(self._row[4]))
+    height = property(lambda self: None if self._row[5] == NONE else self._row[5])
+    weight = property(lambda self: None if self._row[6] == NONE else self._row[6])
+    generation = property(lambda self: self._row[13])
+
+    @property
+    def sprites(self):
+        return [self._snap.string(i) for i in self._snap.ints(self._row[7], self._row[8])]
+
+    @property
+    def moves(self):
+        return [self._snap.string(i) for i in self._snap.ints(self._row[9], self._row[10])]
+
+    @property
+    def types(self):
+        return [self._snap.string(i) for i in self._row[11:13] if i != NONE]
+
+    @property
+    def stats(self):
+        values = self._row[14:14 + len(self._snap.stat_names)]
+        return {name: v for name, v in zip(self._snap.stat_names, values) if v != NO_STAT}
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+
+from sqlalchemy.dialects.sqlite import insert
+
+from models import BASE_DIR, Session, SpriteFile
+
+# Content-addressed store: <SPRITE_DIR>/ab/abcdef....png
+SPRITE_DIR = os.environ.get("POKEPARTY_SPRITES", os.path.join(BASE_DIR, "sprite_cache"))
+
+# How often a worker re-reads the url -> digest index (picks up prefetch runs)
+INDEX_TTL = 300
+
+EXTENSIONS = {"image/png": ".png", "image/gif": ".gif", "image/svg+xml": ".svg", "image/jpeg": ".jpg"}
+CONTENT_TYPES = {ext: ctype for ctype, ext in EXTENSIONS.items()}
+
+_index = {}
+_index_loaded = None  # monotonic time of the last load (None = never)
+_lock = threading.Lock()
+
+
+def sprite_path(digest, content_type):
+    return os.path.join(SPRITE_DIR, digest[:2], digest + EXTENSIONS.get(content_type, ""))
+
+
+def store_sprite(db, url, content, content_type):
+    """Write sprite bytes into the content-addressed cache and record the URL.
+
+    Identical images (common across forms and games) are stored once.
+    Doesn't commit.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    path = sprite_path(digest, content_type)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    values = {"digest": digest, "content_type": content_type, "size": len(content)}
+    db.execute(
+        insert(SpriteFile)
+        .values(url=url, **values)
+        .on_conflict_do_update(index_elements=[SpriteFile.url], set_=values)
+    )
+    with _lock:
+        _index[url] = (digest, content_type)
+    return digest
+
+
+def _sprite_index():
+    global _index, _index_loaded
+    if _index_loaded is None or time.monotonic() - _index_loaded > INDEX_TTL:
+        rows = Session().query(SpriteFile.url, SpriteFile.digest, SpriteFile.content_type).all()
+        with _lock:
+            _index = {url: (digest, ctype) for url, digest, ctype in rows}
+            _index_loaded = time.monotonic()
+    return _index
+
+
+def reload_sprite_index():
+    global _index_loaded
+    _index_loaded = None
+    return _sprite_index()
+
+
+def local_sprite_url(url):
+    """Local /sprites/... URL for a cached sprite, or the upstream URL if it isn't cached."""
+    if not url:
+        return url
+    entry = _sprite_index().get(url)
+    if entry is None:
+        return url
+    digest, content_type = entry
+    return f"/sprites/{digest}{EXTENSIONS.get(content_type, '')}"
+
+
+def sprite_file(name):
+    """(path, content_type) for a /sprites/<digest><ext> request, or None."""
+    digest, ext = os.path.splitext(name)
+    content_type = CONTENT_TYPES.get(ext)
+    if content_type is None or len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+        return None
+    path = sprite_path(digest, content_type)
+    if not os.path.exists(path):
+        return None
+    return path, content_type
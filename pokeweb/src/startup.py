@@ -0,0 +1,59 @@
+import importlib
+import time
+from contextlib import contextmanager
+
+# Import this first (see app.py) so imports are timed from here
+_last = time.perf_counter()
+PHASES = []  # [(kind, name, seconds)], kind is "import" or "init"
+
+
+def mark(name, kind="import"):
+    """Record the time since the previous mark as `name`."""
+    global _last
+    now = time.perf_counter()
+    PHASES.append((kind, name, now - _last))
+    _last = now
+
+
+def timed_import(name, *modules):
+    """Import `modules` now and record the time as `name`."""
+    for module in modules:
+        importlib.import_module(module)
+    mark(name)
+
+
+# The frameworks are timed here, each on its own, so app.py keeps a single
+# import block and marks only its own modules after it
+timed_import("flask", "flask")
+timed_import("sqlalchemy", "sqlalchemy", "sqlalchemy.orm")
+
+
+@contextmanager
+def phase(name):
+    """Time an initialization step."""
+    global _last
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _last = time.perf_counter()
+        PHASES.append(("init", name, _last - start))
+
+
+def report():
+    """One line: total, then import and init time broken down by step."""
+    parts = []
+    for kind in ("import", "init"):
+        steps = [(name, s) for k, name, s in PHASES if k == kind]
+        if steps:
+            detail = ", ".join(f"{name} {s * 1000:.0f}" for name, s in steps)
+            parts.append(f"{kind} {sum(s for _, s in steps) * 1000:.0f}ms ({detail})")
+    total = sum(s for _, _, s in PHASES)
+    return f"⏱️ Started in {total * 1000:.0f}ms: " + " · ".join(parts)
+
+
+def collect():
+    """Startup phases for /metrics."""
+    for kind, name, seconds in PHASES:
+        yield ("pokeparty_startup_seconds", "gauge", "Time spent starting the app, by step",
+               {"kind": kind, "step": name}, seconds)
@@ -1,3 +1,4 @@
-from models import Session, Pokemon
+from models import Session, Pokemon, init_db
+init_db()  # importing models no longer creates the tables
 db = Session()
 print(db.query(Pokemon).count())
\ No newline at end of file
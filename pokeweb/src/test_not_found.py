@@ -0,0 +1,47 @@
+"""/pokemon/<name> for Pokémon that don't exist, including the junk bots send.
+
+    python -m pytest -q test_not_found.py
+
+Runs offline against a throwaway fixture DB (see conftest.py), so nothing
+reaches PokeAPI.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+from fixtures import seed_fixture_db
+
+seed_fixture_db(count=5, users=0)
+from app import create_app
+
+client = create_app().test_client()
+
+
+def test_known_pokemon():
+    assert client.get("/pokemon/1").status_code == 200
+    assert client.get("/pokemon/poke2").status_code == 200
+
+
+def test_unknown_name():
+    resp = client.get("/pokemon/missingno")
+    assert resp.status_code == 404
+    assert b"missingno" in resp.data
+
+
+def test_unknown_id():
+    assert client.get("/pokemon/999").status_code == 404
+    assert client.get("/pokemon/0").status_code == 404
+
+
+def test_non_ascii_digit():
+    assert client.get("/pokemon/²").status_code == 404
+
+
+def test_overlong_number():
+    assert client.get("/pokemon/99999999999999999999999").status_code == 404
+
+
+def test_negative_id():
+    # Not Pokémon #1 with the minus stripped off
+    assert client.get("/pokemon/-1").status_code == 404
+    assert client.get("/pokemon/1.").status_code == 404
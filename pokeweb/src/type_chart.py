@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from itertools import combinations
+
+from models import Session, PokemonType, TypeInfo, cache_version
+
+# How often (seconds) each process checks whether seed.py reloaded the types
+TYPES_RECHECK = float(os.environ.get("POKEPARTY_TYPES_RECHECK", 30))
+
+# Canonical list of standard Pokemon types (Gen 6+)
+TYPE_NAMES = [
+    "normal", "fire", "water", "electric", "grass", "ice",
+    "fighting", "poison", "ground", "flying", "psychic", "bug",
+    "rock", "ghost", "dragon", "dark", "steel", "fairy",
+]
+TYPE_INDEX = {name: i for i, name in enumerate(TYPE_NAMES)}
+N_TYPES = len(TYPE_NAMES)
+
+# Multipliers are stored in quarters so the whole chart fits in 324 bytes
+_QUARTERS = {"weak_to": 8, "resist_from": 2, "immune_from": 0}
+
+
+class TypeChart:
+    """18x18 attack/defense multiplier matrix indexed by position in TYPE_NAMES.
+
+    Defense profiles for every single and dual typing are precomputed, so
+    lookups are a dict hit regardless of how many types are involved.
+    """
+
+    def __init__(self, quarters, loaded_types=0):
+        self.quarters = bytes(quarters)  # row = attacking type, col = defending type
+        self.loaded_types = loaded_types
+        self.version = 0  # "types" cache version it was loaded at
+        self._profiles = {}
+        for i in range(N_TYPES):
+            self._profiles[(i,)] = tuple(self.quarters[a * N_TYPES + i] / 4 for a in range(N_TYPES))
+        for i, j in combinations(range(N_TYPES), 2):
+            p1, p2 = self._profiles[(i,)], self._profiles[(j,)]
+            self._profiles[(i, j)] = tuple(x * y for x, y in zip(p1, p2))
+        self._dex = None
+
+    @classmethod
+    def from_type_info(cls, rows):
+        """Build from TypeInfo rows (defending type -> weak_to/resist_from/immune_from)."""
+        quarters = bytearray([4] * (N_TYPES * N_TYPES))
+        loaded = 0
+        for row in rows:
+            d = TYPE_INDEX.get(row.name)
+            if d is None:
+                continue
+            payload = json.loads(row.data)
+            for key, q in _QUARTERS.items():
+                for attacker in payload.get(key) or []:
+                    a = TYPE_INDEX.get(attacker)
+                    if a is not None:
+                        quarters[a * N_TYPES + d] = q
+            loaded += 1
+        return cls(quarters, loaded)
+
+    def _key(self, defending_types):
+        idx = sorted({TYPE_INDEX[t] for t in defending_types})
+        return tuple(idx)
+
+    def multiplier(self, attacking_type, defending_types):
+        """Damage multiplier of one attacking type against a (dual) typing."""
+        if isinstance(defending_types, str):
+            defending_types = [defending_types]
+        return self.defense_profile(defending_types)[TYPE_INDEX[attacking_type]]
+
+    def defense_profile(self, defending_types):
+        """Tuple of multipliers from every attacking type, in TYPE_NAMES order."""
+        return self._profiles[self._key(defending_types)]
+
+    def defense_map(self, defending_types):
+        return dict(zip(TYPE_NAMES, self.defense_profile(defending_types)))
+
+    def matchups(self, type_name):
+        """Same shape as pokemon_data.get_type_matchups()."""
+        t = TYPE_INDEX.get((type_name or "").lower())
+        result = {k: set() for k in [
+            "weak_to", "strong_against", "resist_from", "immune_from", "resist_to", "immune_to"
+        ]}
+        if t is None:
+            return result
+        for other, name in enumerate(TYPE_NAMES):
+            taken = self.quarters[other * N_TYPES + t]
+            dealt = self.quarters[t * N_TYPES + other]
+            if taken == 8:
+                result["weak_to"].add(name)
+            elif taken == 2:
+                result["resist_from"].add(name)
+            elif taken == 0:
+                result["immune_from"].add(name)
+            if dealt == 8:
+                result["strong_against"].add(name)
+            elif dealt == 2:
+                result["resist_to"].add(name)
+            elif dealt == 0:
+                result["immune_to"].add(name)
+        return result
+
+    def dex_effectiveness(self, refresh=False):
+        """{pokemon_id: defense profile} for every Pokémon in pokemon_type.
+
+        Pokémon sharing a typing share the same profile tuple, so this costs
+        one query plus a dict entry per Pokémon.
+        """
+        if self._dex is None or refresh:
+            by_id = {}
+            rows = Session().query(PokemonType.pokemon_id, PokemonType.type_name).all()
+            for poke_id, type_name in rows:
+                if type_name in TYPE_INDEX:
+                    by_id.setdefault(poke_id, []).append(type_name)
+            self._dex = {pid: self.defense_profile(types) for pid, types in by_id.items()}
+        return self._dex
+
+
+_chart = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def load_type_chart():
+    version = cache_version("types")
+    chart = TypeChart.from_type_info(Session().query(TypeInfo).all())
+    chart.version = version
+    return chart
+
+
+def get_type_chart():
+    """Process-wide chart, loaded on first use (retried while types aren't seeded).
+
+    Every TYPES_RECHECK seconds it's compared with the "types" cache version,
+    which seed_type_data bumps, and rebuilt if that moved.
+    """
+    global _chart, _checked
+    if _chart is not None and _chart.loaded_types and time.monotonic() - _checked < TYPES_RECHECK:
+        return _chart
+    with _lock:
+        now = time.monotonic()
+        if _chart is None or not _chart.loaded_types:
+            _chart = load_type_chart()
+        elif now - _checked >= TYPES_RECHECK and cache_version("types") != _chart.version:
+            _chart = load_type_chart()
+        _checked = now
+    return _chart
+
+
+def reload_type_chart():
+    """Rebuild the chart from type_info, e.g. after seed_type_data."""
+    global _chart
+    chart = load_type_chart()
+    with _lock:
+        _chart = chart
+    return chart
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import record_upstream, record_upstream_wait
+
+# Web requests wait on these, so keep them short: (connect, read) seconds
+UPSTREAM_TIMEOUT = (
+    float(os.environ.get("POKEPARTY_UPSTREAM_CONNECT_TIMEOUT", 3)),
+    float(os.environ.get("POKEPARTY_UPSTREAM_TIMEOUT", 5)),
+)
+UPSTREAM_POOL = int(os.environ.get("POKEPARTY_UPSTREAM_POOL", 16))
+# Stop calling upstream for BREAKER_COOLDOWN seconds after BREAKER_THRESHOLD failures in a row
+BREAKER_THRESHOLD = int(os.environ.get("POKEPARTY_BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.environ.get("POKEPARTY_BREAKER_COOLDOWN", 30))
+
+
+def make_http_session(pool_size=8, retries=5, backoff=0.5):
+    """requests session with a connection pool and retries/backoff on 429 and 5xx."""
+    # requests/urllib3 are imported on first use, not by everything importing this module
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    http = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    return http
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `cooldown` seconds a
+    single trial call is let through and closes it again if it succeeds."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class UpstreamClient:
+    """Shared, pooled JSON client for PokeAPI.
+
+    Concurrent requests for the same URL are coalesced into one upstream call.
+    Futures resolve to (status, json): status is None for a failure (timeout,
+    connection error, open breaker), and json is None for anything but a 200.
+    get_json() is the blocking entry point; aget_json() awaits the same
+    shared future from asyncio code. get() also returns the status, e.g. to
+    tell a confirmed 404 from an outage.
+    """
+
+    def __init__(self, pool_size=UPSTREAM_POOL, timeout=UPSTREAM_TIMEOUT, breaker=None, retries=1):
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.retries = retries
+        self._http = None
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="pokeapi")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "coalesced": 0, "failures": 0, "short_circuited": 0}
+
+    @property
+    def http(self):
+        """The pooled session, created on the first upstream call."""
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    self._http = make_http_session(self.pool_size, retries=self.retries, backoff=0.2)
+        return self._http
+
+    def _fetch(self, url):
+        import requests
+
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            record_upstream(0, "short_circuited")
+            return None, None
+        self.counters["requests"] += 1
+        start = time.perf_counter()
+        try:
+            resp = self.http.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"⚠️ PokeAPI {url}: {e.__class__.__name__}")
+            record_upstream(time.perf_counter() - start, "error")
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+            return None, None
+        record_upstream(time.perf_counter() - start, str(resp.status_code))
+        if resp.status_code >= 500 or resp.status_code == 429:
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+            return resp.status_code, None
+        self.breaker.record_success()
+        if resp.status_code != 200:
+            return resp.status_code, None
+        try:
+            return 200, resp.json()
+        except ValueError:
+            return None, None
+
+    def submit(self, url):
+        """Future for (status, JSON) at `url`, shared with any request already in flight."""
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future
+            future = self._executor.submit(self._fetch, url)
+            self._inflight[url] = future
+        future.add_done_callback(lambda f: self._done(url, f))
+        return future
+
+    def _done(self, url, future):
+        with self._lock:
+            if self._inflight.get(url) is future:
+                del self._inflight[url]
+
+    def get(self, url):
+        start = time.perf_counter()
+        try:
+            return self.submit(url).result()
+        finally:
+            record_upstream_wait(time.perf_counter() - start)
+
+    def get_json(self, url):
+        return self.get(url)[1]
+
+    async def aget_json(self, url):
+        import asyncio
+        return (await asyncio.wrap_future(self.submit(url)))[1]
+
+    def stats(self):
+        return {**self.counters, "in_flight": len(self._inflight), "breaker": self.breaker.state}
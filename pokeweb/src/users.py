@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy.dialects.sqlite import insert
+
+from cache import LRUCache
+from leaderboard import rebuild_leaderboard
+from models import Session, LeaderboardEntry, PokemonRank, User, bump_version, cache_version
+
+# username -> id entries kept per process
+USER_CACHE_ENTRIES = int(os.environ.get("POKEPARTY_USER_CACHE_ENTRIES", 10000))
+# How often (seconds) each process checks whether a user was deleted elsewhere
+USER_RECHECK = float(os.environ.get("POKEPARTY_USER_RECHECK", 5))
+
+# What the routes need to know about the logged-in user
+CurrentUser = namedtuple("CurrentUser", ["id", "username"])
+
+
+class UserIds:
+    """username -> id for existing users, shared by a process's threads.
+
+    Deleting a user bumps the "users" cache version. Each process re-reads
+    it at most every `recheck` seconds and drops its entries when it moved;
+    sessions resolved under an older version are re-resolved too (see
+    app.current_user).
+    """
+
+    def __init__(self, recheck=USER_RECHECK, max_entries=USER_CACHE_ENTRIES):
+        self.recheck = recheck
+        self._ids = LRUCache(max_entries=max_entries, max_bytes=max_entries * 256)
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def version(self):
+        """The "users" version, read from the DB at most every `recheck` seconds."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked < self.recheck:
+            return self._version
+        version = cache_version("users")
+        with self._lock:
+            if version != self._version:
+                self._ids.clear()
+                self._version = version
+            self._checked = now
+        return version
+
+    def get(self, username):
+        """Id of `username`, or None if there's no such user."""
+        version = self.version()
+        user_id = self._ids.get(username)
+        if user_id is None:
+            user_id = Session().query(User.id).filter_by(username=username).scalar()
+            self.put(username, user_id, version)
+        return user_id
+
+    def put(self, username, user_id, version):
+        # Don't cache a lookup that raced with a deletion seen since it started
+        with self._lock:
+            if user_id is not None and version == self._version:
+                self._ids.put(username, user_id)
+
+    def forget(self, username):
+        """Drop `username` and re-read the version on the next lookup."""
+        self._ids.pop(username)
+        self._checked = 0.0
+
+    def stats(self):
+        return self._ids.stats()
+
+
+user_ids = UserIds()
+
+
+def get_or_create_user(username):
+    """Id of `username`, creating the user if needed.
+
+    An INSERT ... ON CONFLICT DO NOTHING, so concurrent first logins with the
+    same name can't both try to create it.
+    """
+    db = Session()
+    version = user_ids.version()
+    db.execute(insert(User).values(username=username).on_conflict_do_nothing(index_elements=[User.username]))
+    user_id = db.query(User.id).filter_by(username=username).scalar()
+    db.commit()
+    user_ids.put(username, user_id, version)
+    return user_id
+
+
+def delete_user(username):
+    """Delete a user and their rankings, and rebuild the leaderboard.
+
+    Returns whether the user existed. Other processes stop accepting the
+    user's sessions within USER_RECHECK seconds.
+    """
+    db = Session()
+    user_id = db.query(User.id).filter_by(username=username).scalar()
+    if user_id is None:
+        return False
+    db.query(LeaderboardEntry).filter_by(user_id=user_id).delete()
+    db.query(PokemonRank).filter_by(user_id=user_id).delete()
+    db.query(User).filter_by(id=user_id).delete()
+    bump_version(db, "users")
+    rebuild_leaderboard()  # commits
+    user_ids.forget(username)
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "delete":
+        name = sys.argv[2].strip().lower()
+        print(f"🗑️ Deleted {name}" if delete_user(name) else f"No user called {name}")
+        Session.remove()
+    else:
+        print("Usage: python users.py delete <username>")
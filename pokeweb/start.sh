@@ -1,6 +1,14 @@
 #!/bin/bash
 set -e
 
+# ./start.sh [gunicorn|dev]  -- gunicorn (default) or Flask's debug server
+SERVER="${1:-gunicorn}"
+case "$SERVER" in
+  gunicorn) CMD=(gunicorn -c gunicorn.conf.py) ;;
+  dev) CMD=(python app.py) ;;
+  *) echo "Usage: $0 [gunicorn|dev]"; exit 1 ;;
+esac
+
 echo "🧹 Removing old pokeparty container (if any)..."
 docker rm -f pokeparty 2>/dev/null || true
 
@@ -13,11 +21,23 @@ if [ ! -f "$DB_PATH" ]; then
   chmod 666 "$DB_PATH"
 fi
 
-echo "🚀 Starting PokéParty container..."
+echo "🔧 Creating/migrating tables..."
+docker run --rm \
+  -v "$(dirname "$DB_PATH")":/data \
+  -e POKEPARTY_DB=/data/db.sqlite \
+  pokeparty python migrate.py init-db
+
+echo "🚀 Starting PokéParty container ($SERVER)..."
+# Mount the whole directory: in WAL mode SQLite keeps db.sqlite-wal/-shm next to the DB
 docker run -d \
   --name pokeparty \
   -p 80:5000 \
-  -v "$DB_PATH":/app/db.sqlite \
-  pokeparty
+  -v "$(dirname "$DB_PATH")":/data \
+  -e POKEPARTY_DB=/data/db.sqlite \
+  -e POKEPARTY_SPRITES=/data/sprite_cache \
+  -e POKEPARTY_GAME_STORE=sqlite \
+  -e POKEPARTY_WORKERS="${POKEPARTY_WORKERS:-4}" \
+  -e POKEPARTY_THREADS="${POKEPARTY_THREADS:-4}" \
+  pokeparty "${CMD[@]}"
 
 echo "✅ PokéParty is running! View logs with: sudo docker logs -f pokeparty"
\ No newline at end of file